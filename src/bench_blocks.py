@@ -0,0 +1,92 @@
+import random
+import time
+
+from markdown_blocks import block_to_block_type, build_block, classify_block, markdown_to_blocks
+from synthetic import make_page
+
+pages = 300
+repeat = 5
+
+
+def legacy_block_to_block_type(block):
+    lines = block.split("\n")
+    if block.startswith(("#", "##", "###", "####", "#####", "######")):
+        return "heading"
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return "code"
+    if block.startswith(">"):
+        for line in lines:
+            if not line.startswith(">"):
+                return "paragraph"
+        return "quote"
+    if block.startswith("* "):
+        for line in lines:
+            if not line.startswith("* "):
+                return "paragraph"
+        return "unordered_list"
+    if block.startswith("- "):
+        for line in lines:
+            if not line.startswith("- "):
+                return "paragraph"
+        return "unordered_list"
+    if block.startswith("1. "):
+        i = 1
+        for line in lines:
+            if not line.startswith(f"{i}. "):
+                return "paragraph"
+            i += 1
+        return "ordered_list"
+    return "paragraph"
+
+
+def legacy_extract(block):
+    # What the old converters re-did after classification: split the block
+    # into lines again and strip each line's marker.
+    block_type = legacy_block_to_block_type(block)
+    lines = block.split("\n")
+    if block_type == "quote":
+        return " ".join(line.lstrip(">").strip() for line in lines)
+    if block_type == "unordered_list":
+        return [line[2:] for line in lines]
+    if block_type == "ordered_list":
+        return [line[3:] for line in lines]
+    if block_type == "paragraph":
+        return " ".join(lines)
+    return block
+
+
+def classify_and_extract(block):
+    return classify_block(block)[1]
+
+
+def best_time(func, blocks):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            func(block)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    rng = random.Random(0)
+    blocks = []
+    for i in range(pages):
+        blocks.extend(markdown_to_blocks(make_page(rng, i, pages, 25, 0.05, 0.01, 0.05)))
+    print(f"{len(blocks)} blocks")
+    for name, func in [
+        ("legacy block_to_block_type", legacy_block_to_block_type),
+        ("block_to_block_type", block_to_block_type),
+        ("legacy classify + extract", legacy_extract),
+        ("classify_block", classify_and_extract),
+        ("build_block (full render)", build_block),
+    ]:
+        elapsed = best_time(func, blocks)
+        print(f"{name:>28}: {elapsed * 1000:8.2f} ms  {elapsed * 1e9 / len(blocks):8.0f} ns/block")
+
+
+if __name__ == "__main__":
+    main()
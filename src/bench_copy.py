@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from copystatic import copy_files_recursive, copy_modes
+
+small_files = 5000
+small_size = 2 * 1024
+large_files = 4
+large_size = 32 * 1024 * 1024
+files_per_dir = 100
+
+
+def legacy_copy_files_recursive(source_dir_path, dest_dir_path):
+    if not os.path.exists(dest_dir_path):
+        os.mkdir(dest_dir_path)
+    for filename in os.listdir(source_dir_path):
+        from_path = os.path.join(source_dir_path, filename)
+        dest_path = os.path.join(dest_dir_path, filename)
+        if os.path.isfile(from_path):
+            shutil.copy(from_path, dest_path)
+        else:
+            legacy_copy_files_recursive(from_path, dest_path)
+
+
+def make_tree(root):
+    small = os.urandom(small_size)
+    for i in range(small_files):
+        dir_path = os.path.join(root, "small", f"d{i // files_per_dir}")
+        os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, f"f{i}.bin"), "wb") as f:
+            f.write(small)
+    os.makedirs(os.path.join(root, "large"))
+    for i in range(large_files):
+        with open(os.path.join(root, "large", f"big{i}.bin"), "wb") as f:
+            f.write(os.urandom(large_size))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    bench_root = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory(dir=bench_root) as tmp:
+        source = os.path.join(tmp, "static")
+        make_tree(source)
+        total = small_files * small_size + large_files * large_size
+        print(f"tree: {small_files} x {small_size} B + {large_files} x {large_size >> 20} MiB = {total >> 20} MiB")
+
+        elapsed = timed(legacy_copy_files_recursive, source, os.path.join(tmp, "legacy"))
+        print(f"{'legacy shutil.copy':>20}: {elapsed:7.3f} s")
+        for mode in copy_modes:
+            for jobs in [1, None]:
+                dest = os.path.join(tmp, f"{mode}-{jobs}")
+                elapsed = timed(copy_files_recursive, source, dest, mode, jobs)
+                label = f"{mode} jobs={jobs or 'auto'}"
+                print(f"{label:>20}: {elapsed:7.3f} s")
+                shutil.rmtree(dest)
+
+
+if __name__ == "__main__":
+    main()
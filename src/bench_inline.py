@@ -0,0 +1,65 @@
+import time
+
+from textnode import (
+    TextNode,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+    text_type_bold,
+    text_type_code,
+    text_type_italic,
+    text_type_text,
+)
+
+sizes = [500, 1000, 2000, 4000, 8000]
+
+
+def legacy_text_to_textnodes(text):
+    node = TextNode(text, text_type_text)
+    bold = split_nodes_delimiter([node], "**", text_type_bold)
+    italic = split_nodes_delimiter(bold, "*", text_type_italic)
+    code = split_nodes_delimiter(italic, "`", text_type_code)
+    image = split_nodes_image(code)
+    return split_nodes_link(image)
+
+
+def make_paragraph(spans):
+    parts = []
+    for i in range(spans):
+        if i % 4 == 0:
+            parts.append(f"see [link {i}](/page/{i})")
+        elif i % 4 == 1:
+            parts.append(f"an ![image {i}](/images/{i}.png)")
+        elif i % 4 == 2:
+            parts.append(f"some **bold {i}** words")
+        else:
+            parts.append(f"and *italic {i}* or `code {i}`")
+    return " ".join(parts)
+
+
+def best_time(func, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    print(f"{'spans':>8} {'chars':>9} {'scanner ms':>11} {'us/span':>8} {'legacy ms':>10} {'us/span':>8}")
+    for spans in sizes:
+        text = make_paragraph(spans)
+        scanner = best_time(text_to_textnodes, text)
+        legacy = best_time(legacy_text_to_textnodes, text)
+        print(
+            f"{spans:>8} {len(text):>9} {scanner * 1000:>11.2f} {scanner * 1e6 / spans:>8.2f}"
+            f" {legacy * 1000:>10.2f} {legacy * 1e6 / spans:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import resource
+import sys
+import tracemalloc
+
+from htmlnode import LeafNode
+from markdown_blocks import markdown_to_html_node
+from textnode import TextNode, text_to_textnodes
+from tracing import count_nodes
+
+sections = 5000
+
+
+class DictLeafNode:
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def make_document(sections):
+    parts = []
+    for i in range(sections):
+        parts.append(f"## Section {i}")
+        parts.append(
+            f"Paragraph {i} has **bold {i}**, *italic {i}*, `code {i}`,"
+            f" a [link {i}](/page/{i}) and an ![image {i}](/images/{i}.png)."
+        )
+        parts.append(f"* first item {i}\n* second *item* {i}\n* third item {i}")
+    return "# Memory benchmark\n\n" + "\n\n".join(parts)
+
+
+def traced_bytes(func, *args):
+    tracemalloc.start()
+    result = func(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def instance_bytes(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak
+    return peak * 1024
+
+
+def main():
+    markdown = make_document(sections)
+    print(f"document: {len(markdown)} chars, {sections} sections")
+
+    node, current, peak = traced_bytes(markdown_to_html_node, markdown)
+    nodes = count_nodes(node)
+    print(f"html tree: {nodes} nodes, {current} bytes live, {peak} bytes peak")
+    print(f"html tree: {current / nodes:.1f} bytes per node (including strings and child lists)")
+
+    paragraph = "Some **bold**, *italic*, `code` and a [link](/x) " * 200
+    text_nodes, current, peak = traced_bytes(text_to_textnodes, paragraph)
+    print(f"text nodes: {len(text_nodes)} nodes, {current / len(text_nodes):.1f} bytes per node")
+
+    print(f"instance size: LeafNode {instance_bytes(LeafNode('b', 'x'))} bytes,"
+          f" dict-backed equivalent {instance_bytes(DictLeafNode('b', 'x'))} bytes")
+    print(f"instance size: TextNode {instance_bytes(TextNode('x', 'bold'))} bytes")
+    print(f"peak RSS: {peak_rss_bytes() / (1 << 20):.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
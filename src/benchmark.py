@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from copystatic import copy_files_recursive
+from markdown_blocks import block_to_block_type, block_type_code, markdown_to_blocks, markdown_to_html_node
+from synthetic import generate_corpus, generate_static
+from template import Template
+from textnode import text_to_textnodes
+
+template_text = "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_stages(args, tmp):
+    content = os.path.join(tmp, "content")
+    static = os.path.join(tmp, "static")
+    page_paths = generate_corpus(
+        content,
+        pages=args.pages,
+        paragraphs=args.paragraphs,
+        depth=args.depth,
+        link_density=args.links,
+        image_density=args.images,
+        emphasis_density=args.emphasis,
+        seed=args.seed,
+    )
+    generate_static(static, files=args.static_files, seed=args.seed)
+
+    # Each stage gets its input precomputed, so its time is its own.
+    sources = []
+    stages = {}
+    stages["read"] = best_of(args.repeat, lambda: read_all(page_paths, sources))
+    markdowns = sources[: len(page_paths)]
+    blocks = [markdown_to_blocks(md) for md in markdowns]
+    inline_texts = [
+        block.replace("\n", " ")
+        for page_blocks in blocks
+        for block in page_blocks
+        if block_to_block_type(block) != block_type_code
+    ]
+    trees = [markdown_to_html_node(md) for md in markdowns]
+    bodies = [tree.to_html() for tree in trees]
+    template = Template(template_text)
+    pages = [template.render({"Title": "title", "Content": body}) for body in bodies]
+    public = os.path.join(tmp, "public")
+
+    stages["markdown_to_blocks"] = best_of(args.repeat, lambda: [markdown_to_blocks(md) for md in markdowns])
+    stages["block_to_block_type"] = best_of(
+        args.repeat, lambda: [block_to_block_type(block) for page_blocks in blocks for block in page_blocks]
+    )
+    stages["text_to_textnodes"] = best_of(args.repeat, lambda: [text_to_textnodes(text) for text in inline_texts])
+    stages["markdown_to_html_node"] = best_of(args.repeat, lambda: [markdown_to_html_node(md) for md in markdowns])
+    stages["to_html"] = best_of(args.repeat, lambda: [tree.to_html() for tree in trees])
+    stages["template_fill"] = best_of(
+        args.repeat, lambda: [template.render({"Title": "title", "Content": body}) for body in bodies]
+    )
+    stages["file_write"] = best_of(args.repeat, lambda: write_all(public, pages))
+    stages["copy_files_recursive"] = best_of(
+        args.repeat, lambda: copy_files_recursive(static, os.path.join(tmp, "public_static"))
+    )
+    return stages
+
+
+def read_all(page_paths, sources):
+    sources.clear()
+    for path in page_paths:
+        with open(path, "r") as f:
+            sources.append(f.read())
+
+
+def write_all(public, pages):
+    os.makedirs(public, exist_ok=True)
+    for i, page in enumerate(pages):
+        with open(os.path.join(public, f"page{i}.html"), "w") as f:
+            f.write(page)
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'stage':>24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for stage, seconds in results["stages"].items():
+        base = baseline["stages"].get(stage)
+        if base is None or base == 0:
+            print(f"{stage:>24} {'-':>10} {seconds:>10.4f}")
+            continue
+        change = seconds / base - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(stage)
+        print(f"{stage:>24} {base:>10.4f} {seconds:>10.4f} {change * 100:>7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each build stage on a synthetic site")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=20, help="blocks per page")
+    parser.add_argument("--depth", type=int, default=2, help="directory nesting depth")
+    parser.add_argument("--links", type=float, default=0.05, help="link density per word")
+    parser.add_argument("--images", type=float, default=0.01, help="image density per word")
+    parser.add_argument("--emphasis", type=float, default=0.05, help="emphasis density per word")
+    parser.add_argument("--static-files", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, best time is kept")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = run_stages(args, tmp)
+
+    config = vars(args).copy()
+    for key in ["output", "compare", "threshold"]:
+        del config[key]
+    results = {"config": config, "python": platform.python_version(), "stages": stages}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("warning: baseline was recorded with different settings")
+        regressions = compare(results, baseline, args.threshold)
+        if len(regressions) > 0:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold * 100:.0f}%")
+            sys.exit(1)
+    else:
+        for stage, seconds in stages.items():
+            print(f"{stage:>24} {seconds:>10.4f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from copystatic import scan_files
+from manifest import hash_file, load_manifest, replaced_on_close, save_manifest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+compressible_extensions = [".html", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".map", ".ico", ".wasm"]
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the bytes identical for identical input.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+def zstd_compress(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+
+def available_encoders():
+    # Suffix of the sibling file -> compress function. gzip is always there;
+    # brotli and zstd only when their modules are installed.
+    encoders = {".gz": gzip_compress}
+    if brotli is not None:
+        encoders[".br"] = brotli_compress
+    if zstandard is not None:
+        encoders[".zst"] = zstd_compress
+    return encoders
+
+
+def compress_files_recursive(dir_path, manifest_path, min_size=1024, encoders=None, jobs=None):
+    # Writes name.gz (and .br / .zst) next to every compressible file of at
+    # least min_size bytes, so a server can send them as they are. The
+    # manifest remembers each file's hash, so only files whose content
+    # changed are compressed again. A sibling that would not be smaller than
+    # the file is not kept.
+    if encoders is None:
+        encoders = available_encoders()
+    old_files = load_manifest(manifest_path).get("files", {})
+    new_files = {}
+    stats = {"compressed": 0, "unchanged": 0, "removed": 0}
+    work = []
+    for rel_path, stat in scan_files(dir_path):
+        plan_file(dir_path, rel_path, stat, old_files, new_files, encoders, min_size, work, stats)
+    finish_compression(dir_path, manifest_path, old_files, new_files, encoders, work, jobs, stats)
+    return stats
+
+
+def compress_files(dir_path, manifest_path, rel_paths, min_size=1024, encoders=None):
+    # compress_files_recursive for just rel_paths, files under dir_path that
+    # changed or were removed; every other file keeps its entry and siblings.
+    if encoders is None:
+        encoders = available_encoders()
+    new_files = load_manifest(manifest_path).get("files", {})
+    old_files = {}
+    stats = {"compressed": 0, "unchanged": 0, "removed": 0}
+    work = []
+    for rel_path in set(rel_paths):
+        if rel_path in new_files:
+            old_files[rel_path] = new_files.pop(rel_path)
+        try:
+            stat = os.stat(os.path.join(dir_path, rel_path))
+        except FileNotFoundError:
+            continue
+        plan_file(dir_path, rel_path, stat, old_files, new_files, encoders, min_size, work, stats)
+    finish_compression(dir_path, manifest_path, old_files, new_files, encoders, work, 1, stats)
+    return stats
+
+
+def plan_file(dir_path, rel_path, stat, old_files, new_files, encoders, min_size, work, stats):
+    if os.path.splitext(rel_path)[1].lower() not in compressible_extensions or stat.st_size < min_size:
+        return
+    path = os.path.join(dir_path, rel_path)
+    old_entry = old_files.get(rel_path)
+    if (
+        old_entry is not None
+        and old_entry["size"] == stat.st_size
+        and old_entry["mtime_ns"] == stat.st_mtime_ns
+    ):
+        file_hash = old_entry["hash"]
+    else:
+        file_hash = hash_file(path)
+    entry = {"hash": file_hash, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    new_files[rel_path] = entry
+    if (
+        old_entry is not None
+        and old_entry["hash"] == file_hash
+        and old_entry.get("encoders") == sorted(encoders)
+        and all(os.path.exists(path + suffix) for suffix in old_entry["written"])
+    ):
+        entry["encoders"] = old_entry["encoders"]
+        entry["written"] = old_entry["written"]
+        stats["unchanged"] += 1
+    else:
+        work.append((path, entry))
+        stats["compressed"] += 1
+
+
+def finish_compression(dir_path, manifest_path, old_files, new_files, encoders, work, jobs, stats):
+    # Compresses the planned work, then drops the siblings of old_files that
+    # their new entry no longer writes.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # zlib, brotli and zstd release the GIL while compressing.
+        list(executor.map(lambda item: compress_file(item[0], item[1], encoders), work))
+
+    for rel_path, old_entry in old_files.items():
+        written = new_files.get(rel_path, {}).get("written", [])
+        for suffix in old_entry.get("written", []):
+            sibling_path = os.path.join(dir_path, rel_path + suffix)
+            if suffix not in written and os.path.exists(sibling_path):
+                os.remove(sibling_path)
+                stats["removed"] += 1
+
+    save_manifest(manifest_path, {"files": new_files})
+
+
+def compress_file(path, entry, encoders):
+    with open(path, "rb") as f:
+        data = f.read()
+    entry["encoders"] = sorted(encoders)
+    entry["written"] = []
+    for suffix, compress in sorted(encoders.items()):
+        sibling_path = path + suffix
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            if os.path.exists(sibling_path):
+                os.remove(sibling_path)
+            continue
+        with replaced_on_close(sibling_path, "wb") as f:
+            f.write(compressed)
+        entry["written"].append(suffix)
+
+
+def remove_compressed_files(dir_path, manifest_path):
+    # Siblings from an earlier build would go stale once their files change
+    # without being compressed again, so a build without compression drops
+    # them all.
+    removed = 0
+    for rel_path, entry in load_manifest(manifest_path).get("files", {}).items():
+        for suffix in entry.get("written", []):
+            sibling_path = os.path.join(dir_path, rel_path + suffix)
+            if os.path.exists(sibling_path):
+                os.remove(sibling_path)
+                removed += 1
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return removed
@@ -1,16 +1,185 @@
 import os
 import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+from manifest import hash_file, load_manifest, save_manifest
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+copy_modes = ["copy", "hardlink", "reflink"]
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+# From linux/fs.h: _IOW(0x94, 9, int)
+ficlone = 0x40049409
+clone_unsupported = set()
+
+
+def copy_files_recursive(source_dir_path, dest_dir_path, mode="copy", jobs=None, sink=None):
+    pairs = []
+    for rel_path, stat in scan_files(source_dir_path):
+        pairs.append((os.path.join(source_dir_path, rel_path), os.path.join(dest_dir_path, rel_path), stat))
+    if sink is None:
+        os.makedirs(dest_dir_path, exist_ok=True)
+    copy_files(pairs, mode, jobs, sink)
+    return len(pairs)
+
+
+def scan_files(dir_path, rel_dir=""):
+    # os.scandir hands back the file type with each entry, so walking the
+    # tree costs one stat per file and no separate exists/isfile calls.
+    files = []
+    with os.scandir(os.path.join(dir_path, rel_dir)) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        rel_path = os.path.join(rel_dir, entry.name)
+        if entry.is_dir():
+            files.extend(scan_files(dir_path, rel_path))
+        else:
+            files.append((rel_path, entry.stat()))
+    return files
+
+
+def copy_files(pairs, mode="copy", jobs=None, sink=None):
+    # sink (see sinks.py), when given, receives the files instead of dest.
+    if mode not in copy_modes:
+        raise ValueError(f"Invalid copy mode: {mode}")
+    if sink is not None:
+        copy = lambda pair: sink.copy_file(pair[0], pair[1], pair[2])
+    else:
+        for dest_dir_path in sorted(set(os.path.dirname(dest_path) for _, dest_path, _ in pairs)):
+            os.makedirs(dest_dir_path, exist_ok=True)
+        copy = lambda pair: copy_file(pair[0], pair[1], mode, pair[2])
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # list() re-raises the first failed copy here instead of dropping it.
+        list(executor.map(copy, pairs))
+
+
+def copy_file(from_path, dest_path, mode="copy", stat=None):
+    if stat is None:
+        stat = os.stat(from_path)
+    if os.path.lexists(dest_path):
+        # Replace rather than overwrite, so a hardlinked dest never writes
+        # through to its source.
+        os.remove(dest_path)
+    if mode == "hardlink":
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            pass
+    copy_file_contents(from_path, dest_path, stat.st_size, mode == "reflink")
+    os.utime(dest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def copy_file_contents(from_path, dest_path, size, clone=False):
+    # A reflink shares extents with the source (copy-on-write) and copies no
+    # data. Otherwise copy_file_range keeps the copy inside the kernel, and
+    # shutil.copyfile falls back to sendfile or a userspace loop. None of
+    # these copy permission bits.
+    if not hasattr(os, "copy_file_range") and not clone:
+        shutil.copyfile(from_path, dest_path)
+        return
+    with open(from_path, "rb") as from_file, open(dest_path, "wb") as to_file:
+        if clone and clone_file(from_file, to_file):
+            return
+        if not hasattr(os, "copy_file_range"):
+            shutil.copyfileobj(from_file, to_file)
+            return
+        copied = 0
+        try:
+            while copied < size:
+                sent = os.copy_file_range(from_file.fileno(), to_file.fileno(), size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError:
+            if copied > 0:
+                raise
+            shutil.copyfileobj(from_file, to_file)
+
+
+def clone_file(from_file, to_file):
+    # Remember failures per device so a filesystem without reflinks costs one
+    # failed ioctl, not one per file.
+    device = os.fstat(to_file.fileno()).st_dev
+    if not sys.platform.startswith("linux") or device in clone_unsupported:
+        return False
+    import fcntl
+
+    try:
+        fcntl.ioctl(to_file.fileno(), ficlone, from_file.fileno())
+        return True
+    except OSError:
+        clone_unsupported.add(device)
+        return False
+
+
+def sync_files_recursive(
+    source_dir_path, dest_dir_path, manifest_path, use_hash=False, mode="copy", jobs=None, sink=None
+):
+    # The manifest remembers which files in dest came from source, so files
+    # that vanished from source can be removed without touching generated pages.
+    manifest = load_manifest(manifest_path)
+    old_files = manifest.get("files", {})
+    new_files = {}
+    stats = {"copied": 0, "unchanged": 0, "removed": 0}
+    pairs = []
+
+    for rel_path, stat in scan_files(source_dir_path):
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        entry = file_entry(from_path, stat, use_hash)
+        new_files[rel_path] = entry
+        if sink is not None:
+            # A sink has no file to stat, so the manifest alone decides.
+            stale = entry != old_files.get(rel_path) or not sink.exists(dest_path)
         else:
-            copy_files_recursive(from_path, dest_path)
\ No newline at end of file
+            stale = needs_copy(entry, old_files.get(rel_path), dest_path)
+        if stale:
+            pairs.append((from_path, dest_path, stat))
+            stats["copied"] += 1
+        else:
+            stats["unchanged"] += 1
+    copy_files(pairs, mode, jobs, sink)
+
+    for rel_path in old_files:
+        if rel_path in new_files:
+            continue
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if sink is not None:
+            if sink.exists(dest_path):
+                sink.remove(dest_path)
+                stats["removed"] += 1
+        elif os.path.isfile(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+            stats["removed"] += 1
+
+    save_manifest(manifest_path, {"files": new_files})
+    return stats
+
+
+def file_entry(path, stat, use_hash):
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if use_hash:
+        entry["hash"] = hash_file(path)
+    return entry
+
+
+def needs_copy(entry, old_entry, dest_path):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return True
+    if dest_stat.st_size != entry["size"]:
+        return True
+    if "hash" in entry:
+        # Content decides: a touched but identical file is not copied, and an
+        # edit that kept size and mtime is still caught.
+        return old_entry is None or old_entry.get("hash") != entry["hash"]
+    return dest_stat.st_mtime_ns != entry["mtime_ns"]
+
+
+def remove_empty_dirs(dir_path, stop_path):
+    stop_path = os.path.abspath(stop_path)
+    while os.path.abspath(dir_path) != stop_path and len(os.listdir(dir_path)) == 0:
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import parse_qs, urlsplit
+
+from copystatic import sync_files_recursive
+from frontmatter import read_front_matter, template_values
+from gencontent import find_page_template, generate_pages_incremental, page_dest_path, page_title, update_page
+from markdown_blocks import block_memo, iter_markdown_html
+from template import load_template, template_cache
+from tracing import BuildReporter
+
+
+class RenderDaemon:
+    # Serves previews and rebuilds from one long-lived process, so templates,
+    # memoized blocks, the page cache and the image index stay warm between
+    # requests. At most max_concurrent requests run at once; writes to the
+    # output directory are serialized. /rebuild renders only its page and
+    # updates only its manifest entry; refresh, when given, is then called
+    # like SiteWatcher's to bring the sitemap, search shards and compressed
+    # copies up to date for that page. rebuild, when given, is a function
+    # running an incremental build of the whole site and returning its stats
+    # and image index; /rebuild-all goes through it, so every derived output
+    # is refreshed too.
+    def __init__(
+        self,
+        dir_path_content,
+        dir_path_static,
+        template_path,
+        dir_path_public,
+        manifest_path,
+        static_manifest_path,
+        cache=None,
+        images=None,
+        max_concurrent=4,
+        drafts=False,
+        rebuild=None,
+        refresh=None,
+    ):
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.dir_path_public = dir_path_public
+        self.manifest_path = manifest_path
+        self.static_manifest_path = static_manifest_path
+        self.cache = cache
+        self.images = images
+        self.drafts = drafts
+        self.rebuild = rebuild
+        self.refresh = refresh
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.build_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+        self.rejected = 0
+        self.template_mtimes = {}
+
+    def template(self, path):
+        # Parsed once, and again only when the file changes on disk.
+        mtime_ns = os.stat(path).st_mtime_ns
+        if self.template_mtimes.get(path) != mtime_ns:
+            template_cache.pop(path, None)
+            self.template_mtimes[path] = mtime_ns
+        return load_template(path)
+
+    def render_markdown(self, markdown, page_path=None):
+        # A full page for markdown, as it would be built at page_path (a path
+        # under the content directory, which picks the template).
+        template_path = self.template_path
+        if page_path is not None:
+            template_path = find_page_template(
+                self.content_path(page_path), self.dir_path_content, self.template_path
+            )
+        meta, lines = read_front_matter(markdown.split("\n"))
+        lines = list(lines)
+        values = template_values(meta)
+        values["Title"] = page_title(meta, lines)
+        values["Content"] = "".join(iter_markdown_html(lines, block_memo))
+        return self.template(template_path).render(values)
+
+    def content_path(self, page_path):
+        # page_path comes from the request, so it may only name something
+        # inside the content directory.
+        rel_path = os.path.normpath(page_path)
+        if os.path.isabs(rel_path) or rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise FileNotFoundError(f"No such page: {page_path}")
+        return os.path.join(self.dir_path_content, rel_path)
+
+    def rebuild_path(self, page_path):
+        from_path = self.content_path(page_path)
+        if not os.path.isfile(from_path) or not from_path.endswith(".md"):
+            raise FileNotFoundError(f"No such page: {page_path}")
+        self.template(find_page_template(from_path, self.dir_path_content, self.template_path))
+        with self.build_lock:
+            # Drafts are not published; one that was is taken down.
+            dest_path = update_page(
+                from_path,
+                self.dir_path_content,
+                self.template_path,
+                self.dir_path_public,
+                self.manifest_path,
+                self.cache,
+                self.images,
+                self.drafts,
+            )
+            if self.refresh is not None:
+                output = page_dest_path(from_path, self.dir_path_content, self.dir_path_public)
+                self.refresh([os.path.relpath(output, self.dir_path_public)], True)
+        if dest_path is None:
+            return {"dest": None, "draft": True}
+        return {"dest": str(dest_path), "draft": False}
+
+    def rebuild_all(self):
+        if self.rebuild is not None:
+            with self.build_lock:
+                stats, self.images = self.rebuild()
+            return stats
+        reporter = BuildReporter("quiet")
+        with self.build_lock:
+            static = sync_files_recursive(self.dir_path_static, self.dir_path_public, self.static_manifest_path)
+            generate_pages_incremental(
+                self.dir_path_content,
+                self.template_path,
+                self.dir_path_public,
+                self.manifest_path,
+                reporter=reporter,
+                cache=self.cache,
+                images=self.images,
+                drafts=self.drafts,
+            )
+        return {"static": static, "pages": reporter.done}
+
+    def record(self, endpoint, elapsed_ms, failed):
+        with self.stats_lock:
+            stats = self.stats.setdefault(endpoint, {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += 1 if failed else 0
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def stats_report(self):
+        with self.stats_lock:
+            endpoints = {
+                endpoint: dict(stats, mean_ms=stats["total_ms"] / stats["requests"])
+                for endpoint, stats in self.stats.items()
+            }
+            return {
+                "endpoints": endpoints,
+                "rejected": self.rejected,
+                "block_memo": {"hits": block_memo.hits, "misses": block_memo.misses},
+            }
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    # POST /render[?path=page.md]   body: markdown -> the rendered page
+    # POST /rebuild?path=page.md    re-render one page into the output
+    # POST /rebuild-all             sync static files and rebuild changed pages
+    # GET  /stats                   request counts and timings per endpoint
+    daemon = None
+    protocol_version = "HTTP/1.1"
+    slot_timeout = 5
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            self.send_body(200, "application/json", json.dumps(self.daemon.stats_report()))
+        else:
+            self.send_body(404, "text/plain", "not found\n")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        page_path = query.get("path", [None])[0]
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode() if length > 0 else ""
+
+        if url.path == "/render":
+            action = lambda: ("text/html; charset=utf-8", self.daemon.render_markdown(body, page_path))
+        elif url.path == "/rebuild" and page_path is not None:
+            action = lambda: ("application/json", json.dumps(self.daemon.rebuild_path(page_path)))
+        elif url.path == "/rebuild-all":
+            action = lambda: ("application/json", json.dumps(self.daemon.rebuild_all()))
+        else:
+            self.send_body(404, "text/plain", "not found\n")
+            return
+
+        if not self.daemon.slots.acquire(timeout=self.slot_timeout):
+            with self.daemon.stats_lock:
+                self.daemon.rejected += 1
+            self.send_body(503, "text/plain", "busy\n")
+            return
+        start = time.perf_counter()
+        failed = False
+        try:
+            content_type, text = action()
+            status = 200
+        except FileNotFoundError as e:
+            failed = True
+            status, content_type, text = 404, "text/plain", f"{e}\n"
+        except Exception as e:
+            failed = True
+            status, content_type, text = 400, "text/plain", f"{type(e).__name__}: {e}\n"
+        finally:
+            self.daemon.slots.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.daemon.record(url.path, elapsed_ms, failed)
+        self.send_body(status, content_type, text, {"X-Render-Time-Ms": f"{elapsed_ms:.2f}"})
+
+    def send_body(self, status, content_type, text, headers=None):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_daemon(daemon, port=8888, socket_path=None):
+    # Binds to a Unix socket when socket_path is given, otherwise to
+    # 127.0.0.1 only: the API can write to the output directory.
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"daemon": daemon})
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        print(f"Render daemon listening on {socket_path} (Ctrl-C to stop)")
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        server.daemon_threads = True
+        print(f"Render daemon listening on http://127.0.0.1:{server.server_address[1]}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,89 @@
+import itertools
+import os
+from datetime import datetime, timezone
+
+# Front matter opens the file with one of these lines and closes with the
+# same line. Between them each line is "key: value" (YAML subset) or
+# "key = value" (TOML style); "#" starts a comment line.
+front_matter_separators = {"---": ":", "+++": "="}
+
+
+def read_front_matter(lines):
+    # Consumes the front matter from an iterator of lines and returns (meta,
+    # the remaining lines). Without front matter nothing is lost: the first
+    # line is put back in front of the rest.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter([])
+    delimiter = first.rstrip("\r\n")
+    if delimiter not in front_matter_separators:
+        return {}, itertools.chain([first], lines)
+    separator = front_matter_separators[delimiter]
+    meta = {}
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line == delimiter:
+            return meta, lines
+        if line.strip() == "" or line.lstrip().startswith("#"):
+            continue
+        key, found, value = line.partition(separator)
+        if found == "" or key.strip() == "":
+            raise ValueError(f"Invalid front matter line: {line}")
+        meta[key.strip()] = parse_value(value)
+    raise ValueError("Front matter not closed")
+
+
+def parse_value(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_value(part) for part in text[1:-1].split(",") if part.strip() != ""]
+    if text in ("true", "false"):
+        return text == "true"
+    return text
+
+
+def read_front_matter_file(path):
+    # The fast path: stops reading at the closing delimiter, so the body of
+    # the file is never read (beyond the first buffered block).
+    with open(path, "r") as f:
+        meta, _ = read_front_matter(f)
+    return meta
+
+
+def is_draft(meta):
+    return meta.get("draft") is True
+
+
+def page_date(meta, mtime_ns=None):
+    # The page's date as an aware datetime: front matter "date" (ISO 8601,
+    # UTC unless it says otherwise), else the source mtime, else None.
+    value = meta.get("date")
+    if isinstance(value, str):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            date = None
+        if date is not None:
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=timezone.utc)
+            return date
+    if mtime_ns is not None:
+        return datetime.fromtimestamp(mtime_ns // 1_000_000_000, timezone.utc)
+    return None
+
+
+def template_values(meta):
+    # Front matter fields as template placeholders: "description" fills
+    # {{ Description }}. Lists are joined with ", ".
+    values = {}
+    for key, value in meta.items():
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        values[key[:1].upper() + key[1:]] = value
+    return values
+
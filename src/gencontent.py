@@ -1,46 +1,596 @@
+import hashlib
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
+from copystatic import remove_empty_dirs
+from frontmatter import is_draft, read_front_matter, read_front_matter_file, template_values
+from images import page_image_fingerprint, use_image_index
+from linkindex import extract_targets
+from markdown_blocks import block_memo, block_to_html_node, iter_blocks, iter_markdown_html
+from manifest import hash_file, load_manifest, save_manifest
+from pipeline import format_pipeline_stats, run_pipeline
+from sinks import file_sink
+from template import clear_template_cache, load_template, template_filename
+from tracing import BuildReporter, PageTrace, count_nodes
 
+# Modules whose code decides what a page renders to, or what the manifest
+# records about it.
+renderer_modules = [
+    "frontmatter",
+    "gencontent",
+    "htmlnode",
+    "images",
+    "linkindex",
+    "markdown_blocks",
+    "template",
+    "textnode",
+]
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    for filename in os.listdir(dir_path_content):
+
+def renderer_fingerprint():
+    digest = hashlib.sha256()
+    for name in renderer_modules:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name + ".py"), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# Part of every manifest and of the page cache's directory name. The number
+# is bumped when output changes on purpose; the fingerprint catches any other
+# edit to the renderer, so output from an older generator is never reused.
+generator_version = f"2-{renderer_fingerprint()}"
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    jobs=1,
+    reporter=None,
+    cache=None,
+    pipeline=None,
+    images=None,
+    drafts=False,
+    sink=None,
+):
+    pages = find_pages(dir_path_content, template_path, dest_dir_path)
+    if not drafts:
+        pages = [page for page in pages if not is_draft_page(page[0])]
+    errors = generate_pages(pages, jobs, reporter, cache, pipeline, images, sink)
+    raise_page_errors(errors)
+
+
+def is_draft_page(from_path):
+    # Only the front matter is read. A page whose front matter cannot be read
+    # is kept, so it fails when rendered, like any other broken page, instead
+    # of stopping the whole build here.
+    try:
+        return is_draft(read_front_matter_file(from_path))
+    except ValueError:
+        return False
+
+
+def find_pages(dir_path_content, template_path, dest_dir_path):
+    # A template.html inside a content directory overrides the template for
+    # every page in that directory and below it.
+    override_path = os.path.join(dir_path_content, template_filename)
+    if os.path.isfile(override_path):
+        template_path = override_path
+
+    pages = []
+    for filename in sorted(os.listdir(dir_path_content)):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
         if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path)
+            if filename.endswith(".md"):
+                pages.append((from_path, template_path, Path(dest_path).with_suffix(".html")))
+        else:
+            pages.extend(find_pages(from_path, template_path, dest_path))
+    return pages
+
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    return Path(os.path.join(dest_dir_path, rel_path)).with_suffix(".html")
+
+
+def find_page_template(from_path, dir_path_content, template_path):
+    # Same rule as find_pages, for a single page: the deepest template.html
+    # between the content root and the page's directory wins.
+    dir_path = dir_path_content
+    rel_dirs = os.path.dirname(os.path.relpath(from_path, dir_path_content))
+    parts = [] if rel_dirs == "" else rel_dirs.split(os.sep)
+    for part in [""] + parts:
+        dir_path = os.path.join(dir_path, part)
+        override_path = os.path.join(dir_path, template_filename)
+        if os.path.isfile(override_path):
+            template_path = override_path
+    return template_path
+
+
+def generate_pages(pages, jobs=1, reporter=None, cache=None, pipeline=None, images=None, sink=None):
+    # pipeline, when given, is a dict of run_pipeline options (readers,
+    # writers, queue_size) and replaces the worker processes. images, an
+    # images.ImageIndex, stays installed for later renders in this process.
+    # sink (see sinks.py) receives the pages instead of the filesystem; a
+    # sink that lives in this process rules out worker processes.
+    if reporter is None:
+        reporter = BuildReporter("quiet")
+    # Templates are parsed once per build; drop any left over from a previous one.
+    clear_template_cache()
+    if images is not None:
+        use_image_index(images)
+    tasks = [
+        (from_path, template_path, dest_path, reporter.tracing, cache, sink)
+        for from_path, template_path, dest_path in pages
+    ]
+    reporter.start(len(tasks))
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    if sink is not None and sink.threads_only:
+        jobs = 1
+    if pipeline is not None:
+        errors = generate_pages_pipelined(pages, reporter, cache, pipeline, sink)
+    elif jobs == 1 or len(tasks) <= 1:
+        results = map(try_generate_page, tasks)
+        errors = collect_page_errors(tasks, results, reporter)
+    else:
+        chunksize = max(1, len(tasks) // (jobs * 8))
+        initializer = None if images is None else use_image_index
+        with ProcessPoolExecutor(max_workers=jobs, initializer=initializer, initargs=(images,)) as executor:
+            results = executor.map(try_generate_page, tasks, chunksize=chunksize)
+            errors = collect_page_errors(tasks, results, reporter)
+    if cache is not None:
+        removed = cache.evict()
+        if removed > 0:
+            reporter.note(f"evicted {removed} cached page(s)")
+    return errors
+
+
+def try_generate_page(task):
+    from_path, template_path, dest_path, tracing, cache, sink = task
+    trace = None
+    if tracing:
+        trace = PageTrace(from_path)
+    hits = block_memo.hits
+    misses = block_memo.misses
+    try:
+        generate_page(from_path, template_path, dest_path, trace, cache, sink)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None, {}
+    stats = {"block memo hits": block_memo.hits - hits, "block memo misses": block_memo.misses - misses}
+    return None, trace, stats
+
+
+def collect_page_errors(tasks, results, reporter):
+    # Results come back in task order, so the log is the same for any job count.
+    errors = []
+    for (from_path, template_path, dest_path, _, _, _), (error, trace, stats) in zip(tasks, results):
+        reporter.add_stats(stats)
+        if error is None:
+            reporter.page_done(from_path, template_path, dest_path, trace)
+        else:
+            reporter.page_failed(from_path, error)
+            errors.append((from_path, error))
+    reporter.finish()
+    return errors
+
+
+def generate_pages_pipelined(pages, reporter, cache, pipeline, sink=None):
+    # Source reads and page cache lookups run on reader threads and page
+    # writes on writer threads, overlapping the I/O with rendering on this
+    # thread. Pages are reported as their writes complete.
+    hits = block_memo.hits
+    misses = block_memo.misses
+    traces = {}
+    if reporter.tracing:
+        traces = {from_path: PageTrace(from_path) for from_path, _, _ in pages}
+    results, stats = run_pipeline(
+        pages,
+        lambda page: traced_stage(traces.get(page[0]), "read", read_page_source, page[0], cache, traces.get(page[0])),
+        lambda page, source: traced_stage(
+            traces.get(page[0]), "render", render_page_source, source, traces.get(page[0])
+        ),
+        lambda page, rendered: traced_stage(
+            traces.get(page[0]), "write", write_rendered_page, page[1], page[2], rendered, cache, sink
+        ),
+        **pipeline,
+    )
+    reporter.add_stats({"block memo hits": block_memo.hits - hits, "block memo misses": block_memo.misses - misses})
+    errors = []
+    for (from_path, template_path, dest_path), error in results:
+        if error is None:
+            reporter.page_done(from_path, template_path, dest_path, traces.get(from_path))
+        else:
+            reporter.page_failed(from_path, error)
+            errors.append((from_path, error))
+    reporter.finish()
+    if len(pages) > 0:
+        reporter.status(format_pipeline_stats(stats))
+    return sorted(errors)
+
+
+def traced_stage(trace, stage, run, *args):
+    if trace is None:
+        return run(*args)
+    start_ns = time.perf_counter_ns()
+    result = run(*args)
+    trace.span(stage, start_ns)
+    return result
+
+
+def read_page_source(from_path, cache, trace=None):
+    # Returns (meta, title, text, source_hash): a cache hit has its title and
+    # rendered body, a miss has no title yet and the markdown body's lines.
+    with open(from_path, "rb") as from_file:
+        data = from_file.read()
+    meta, lines = read_front_matter(data.decode().split("\n"))
+    lines = list(lines)
+    if trace is not None:
+        trace.counts["bytes_in"] = len(data)
+    source_hash = None
+    if cache is not None:
+        srcs = body_image_srcs(lines) if b"![" in data else []
+        source_hash = page_cache_key(hashlib.sha256(data).hexdigest(), srcs)
+        cached = cache.open(source_hash)
+        if cached is not None:
+            with cached:
+                title = cached.readline().rstrip("\n")
+                if trace is not None:
+                    trace.counts["cached"] = 1
+                return meta, title, cached.read(), None
+    return meta, None, lines, source_hash
+
+
+def render_page_source(source, trace=None):
+    meta, title, text, source_hash = source
+    if title is not None:
+        return source
+    if trace is None:
+        body = "".join(iter_markdown_html(text, block_memo))
+    else:
+        # The same body, block by block, counted as render_page_traced does.
+        entries = [block_memo.entry(block) for block in iter_blocks(text)]
+        body = "<div>" + "".join(block_html for block_html, _ in entries) + "</div>"
+        trace.counts["blocks"] = len(entries)
+        trace.counts["nodes"] = 1 + sum(block_nodes for _, block_nodes in entries)
+        trace.counts["bytes_out"] = len(body)
+    return meta, page_title(meta, text), body, source_hash
+
+
+def write_rendered_page(template_path, dest_path, rendered, cache, sink=None):
+    meta, title, body, source_hash = rendered
+    write_page(dest_path, load_template(template_path), title, body, meta, sink)
+    if source_hash is not None:
+        cache.put(source_hash, title, body)
+
+
+def raise_page_errors(errors):
+    if len(errors) > 0:
+        raise Exception(f"{len(errors)} page(s) failed to build, first: {errors[0][0]}: {errors[0][1]}")
+
+
+def generate_pages_incremental(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest_path,
+    jobs=1,
+    reporter=None,
+    cache=None,
+    pipeline=None,
+    images=None,
+    drafts=False,
+    sink=None,
+    links=False,
+):
+    # links records each page's link targets in the manifest for the link
+    # check; image targets are always recorded.
+    if reporter is None:
+        reporter = BuildReporter("quiet")
+    if sink is None:
+        sink = file_sink
+    manifest = load_manifest(manifest_path)
+    rebuild_all = manifest.get("generator_version") != generator_version
+    old_pages = manifest.get("pages", {})
+    new_pages = {}
+    stale_pages = []
+    template_hashes = {}
+
+    for from_path, page_template_path, dest_path in find_pages(dir_path_content, template_path, dest_dir_path):
+        if page_template_path not in template_hashes:
+            template_hashes[page_template_path] = hash_file(page_template_path)
+        key = os.path.relpath(from_path, dir_path_content)
+        # Metadata extracted by an older generator is not trusted either.
+        entry = source_entry(from_path, None if rebuild_all else old_pages.get(key), links)
+        if is_draft(entry["meta"]) and not drafts:
+            # Left out of the manifest, so a page that became a draft has
+            # its published output removed below.
+            continue
+        # Relative, so the manifest stays valid when the build goes into a
+        # different directory (staged builds alternate between two).
+        entry["dest"] = os.path.relpath(dest_path, dest_dir_path)
+        entry["template_hash"] = template_hashes[page_template_path]
+        if images is not None:
+            entry["image_attributes"] = images.page_fingerprint(entry["images"])
+        new_pages[key] = entry
+
+        old_entry = old_pages.get(key)
+        if (
+            rebuild_all
+            or old_entry is None
+            or old_entry["hash"] != entry["hash"]
+            or old_entry["dest"] != entry["dest"]
+            or old_entry.get("template_hash") != entry["template_hash"]
+            or old_entry.get("image_attributes") != entry.get("image_attributes")
+            or not sink.exists(dest_path)
+        ):
+            stale_pages.append((from_path, page_template_path, dest_path))
+
+    for key, old_entry in old_pages.items():
+        if key in new_pages and new_pages[key]["dest"] == old_entry["dest"]:
+            continue
+        old_dest_path = os.path.join(dest_dir_path, old_entry["dest"])
+        if sink.exists(old_dest_path):
+            reporter.note(f"removing {old_dest_path}")
+            sink.remove(old_dest_path)
+
+    errors = generate_pages(stale_pages, jobs, reporter, cache, pipeline, images, sink)
+    for from_path, error in errors:
+        # Leave failed pages out of the manifest so the next build retries them.
+        del new_pages[os.path.relpath(from_path, dir_path_content)]
+
+    save_manifest(manifest_path, {
+        "generator_version": generator_version,
+        "pages": new_pages,
+    })
+    raise_page_errors(errors)
+
+
+def update_page(
+    from_path, dir_path_content, template_path, dest_dir_path, manifest_path, cache=None, images=None, drafts=False
+):
+    # generate_pages_incremental for one new, changed or removed page, with
+    # the templates, page cache and image index the caller keeps warm: only
+    # this page is rendered and only its manifest entry is rewritten.
+    # Returns the output path, or None when the page is gone or a draft.
+    manifest = load_manifest(manifest_path)
+    pages = manifest.setdefault("pages", {})
+    key = os.path.relpath(from_path, dir_path_content)
+    old_entry = pages.pop(key, None)
+    if manifest.get("generator_version") != generator_version:
+        old_entry = None
+    dest_path = page_dest_path(from_path, dir_path_content, dest_dir_path)
+    entry = None
+    if os.path.isfile(from_path):
+        entry = source_entry(from_path, old_entry, old_entry is not None and "links" in old_entry)
+        if is_draft(entry["meta"]) and not drafts:
+            entry = None
+    if entry is None:
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+        save_manifest(manifest_path, manifest)
+        return None
+    page_template_path = find_page_template(from_path, dir_path_content, template_path)
+    entry["dest"] = os.path.relpath(dest_path, dest_dir_path)
+    entry["template_hash"] = hash_file(page_template_path)
+    if images is not None:
+        use_image_index(images)
+        entry["image_attributes"] = images.page_fingerprint(entry["images"])
+    generate_page(from_path, page_template_path, dest_path, cache=cache)
+    pages[key] = entry
+    save_manifest(manifest_path, manifest)
+    return dest_path
+
+
+def source_entry(from_path, old_entry, links=False):
+    # Hashing every source is the slow part of a no-op build, so trust the
+    # previous entry while the file's size and mtime are unchanged. The page's
+    # title, image targets and (with links) link targets make the manifest a
+    # metadata index for the link check, sitemap and feeds, along with its
+    # front matter.
+    stat = os.stat(from_path)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if (
+        old_entry is not None
+        and old_entry.get("size") == stat.st_size
+        and old_entry.get("mtime_ns") == stat.st_mtime_ns
+        and "meta" in old_entry
+        and (not links or "links" in old_entry)
+    ):
+        for name in ["hash", "meta", "title", "links", "images"]:
+            if name in old_entry:
+                entry[name] = old_entry[name]
+        return entry
+    # Otherwise one streaming pass hashes the source and extracts all of it,
+    # holding a block at a time. A page with broken front matter or no title
+    # fails to build and is left out of the manifest; its entry only needs to
+    # get that far.
+    entry["meta"] = {}
+    entry["title"] = None
+    if links:
+        entry["links"] = []
+    entry["images"] = []
+    digest = hashlib.sha256()
+    title_lines = []
+    with open(from_path, "rb") as from_file:
+        lines = hashed_lines(from_file, digest)
+        try:
+            entry["meta"], body_lines = read_front_matter(lines)
+            page_links, entry["images"] = extract_targets(first_title_line(body_lines, title_lines), links)
+            if links:
+                entry["links"] = page_links
+        except ValueError:
+            pass
+        # Whatever was not parsed still counts towards the hash.
+        for _ in lines:
+            pass
+    entry["hash"] = digest.hexdigest()
+    try:
+        entry["title"] = page_title(entry["meta"], title_lines)
+    except ValueError:
+        pass
+    return entry
+
+
+def hashed_lines(from_file, digest):
+    for line in from_file:
+        digest.update(line)
+        yield line.decode()
+
+
+def first_title_line(lines, found):
+    # Passes lines through, keeping the first "# " line in found.
+    for line in lines:
+        if len(found) == 0 and line.startswith("# "):
+            found.append(line)
+        yield line
+
+
+def page_cache_key(source_hash, srcs):
+    # A cached body embeds the attributes of the page's images, so they are
+    # part of its key: changing an image only misses the pages that show it.
+    fingerprint = page_image_fingerprint(srcs)
+    if fingerprint is None:
+        return source_hash
+    return f"{source_hash}-{fingerprint}"
+
+
+def source_cache_key(from_path):
+    # page_cache_key for a file, streamed; the image targets are only
+    # extracted, in a second pass, from a source that has any.
+    digest = hashlib.sha256()
+    has_images = False
+    with open(from_path, "rb") as from_file:
+        for line in from_file:
+            digest.update(line)
+            has_images = has_images or b"![" in line
+    srcs = []
+    if has_images:
+        srcs = file_image_srcs(from_path)
+    return page_cache_key(digest.hexdigest(), srcs)
+
+
+def file_image_srcs(from_path):
+    # Image targets of a page, only read once iterated; a page whose front
+    # matter cannot be read has none.
+    with open(from_path, "r") as from_file:
+        try:
+            _, lines = read_front_matter(from_file)
+        except ValueError:
+            return
+        yield from body_image_srcs(lines)
+
+
+def body_image_srcs(lines):
+    _, srcs = extract_targets(lines, links=False)
+    yield from srcs
+
+
+def generate_page(from_path, template_path, dest_path, trace=None, cache=None, sink=None):
+    template = load_template(template_path)
+
+    if cache is not None:
+        source_hash = source_cache_key(from_path)
+        cached = cache.open(source_hash)
+        if cached is not None:
+            # The body is cached; the placeholders only need the front matter.
+            meta = read_front_matter_file(from_path)
+            with cached:
+                title = cached.readline().rstrip("\n")
+                write_page(dest_path, template, title, iter(lambda: cached.read(1 << 16), ""), meta, sink)
+            if trace is not None:
+                trace.lap("cached")
+                trace.counts = {"cached": 1}
+            return
+
+    if trace is not None:
+        meta, title, body = render_page_traced(from_path, trace)
+        if cache is not None:
+            cache.put(source_hash, title, body)
+        write_page(dest_path, template, title, body, meta, sink)
+        trace.lap("write")
+        return
+
+    # The source is streamed twice: once up to its title, then block by block
+    # into the output, so even huge generated documents stay out of memory.
+    # A title in the front matter saves the first pass.
+    with open(from_path, "r") as from_file:
+        meta, lines = read_front_matter(from_file)
+        if "title" in meta:
+            title = page_title(meta, lines)
         else:
-            generate_pages_recursive(from_path, template_path, dest_path)
+            title = extract_title_from_lines(lines)
+            from_file.seek(0)
+            _, lines = read_front_matter(from_file)
+        body = iter_markdown_html(lines, block_memo)
+        if cache is not None:
+            body = cache.tee(source_hash, title, body)
+        write_page(dest_path, template, title, body, meta, sink)
 
 
-def generate_page(from_path, template_path, dest_path):
-    print(f" * {from_path} {template_path} -> {dest_path}")
-    from_file = open(from_path, "r")
-    markdown_content = from_file.read()
-    from_file.close()
+def render_page_traced(from_path, trace):
+    # Streaming interleaves every stage, so a traced page runs them one after
+    # another instead; the output is identical.
+    with open(from_path, "r") as from_file:
+        markdown_content = from_file.read()
+    trace.lap("read")
+    meta, lines = read_front_matter(markdown_content.split("\n"))
+    lines = list(lines)
+    blocks = list(iter_blocks(lines))
+    trace.lap("blocks")
+    entries = [block_memo.lookup(block) for block in blocks]
+    trace.lap("memo")
+    nodes = {i: block_to_html_node(block) for i, (block, entry) in enumerate(zip(blocks, entries)) if entry is None}
+    trace.lap("parse")
+    for i, node in nodes.items():
+        entries[i] = block_memo.store(blocks[i], node.to_html(), count_nodes(node))
+    html = "<div>" + "".join(block_html for block_html, _ in entries) + "</div>"
+    trace.lap("serialize")
+    trace.counts = {
+        "bytes_in": len(markdown_content),
+        "blocks": len(blocks),
+        "nodes": 1 + sum(block_nodes for _, block_nodes in entries),
+        "bytes_out": len(html),
+    }
+    return meta, page_title(meta, lines), html
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
+def write_page(dest_path, template, title, body, meta=None, sink=None):
+    if sink is None:
+        sink = file_sink
+    values = {} if meta is None else template_values(meta)
+    values["Title"] = title
+    values["Content"] = body
+    with sink.open(dest_path) as to_file:
+        template.write_to(to_file, values)
 
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
 
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+def page_url(dest):
+    # The URL path a page is served at, from its manifest dest: index.html
+    # pages are addressed by their directory.
+    url = "/" + dest.replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return url
 
 
 def extract_title(md):
-    lines = md.split("\n")
+    meta, lines = read_front_matter(md.split("\n"))
+    return page_title(meta, lines)
+
+
+def page_title(meta, lines):
+    # A title in the front matter wins over the first "# " heading.
+    if "title" in meta:
+        return str(meta["title"])
+    return extract_title_from_lines(lines)
+
+
+def extract_title_from_lines(lines):
     for line in lines:
         if line.startswith("# "):
-            return line[2:]
+            return line[2:].rstrip("\r\n")
     raise ValueError("No title found")
@@ -1,6 +1,8 @@
 
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -9,6 +11,26 @@ class HTMLNode:
 
     def to_html(self):
         raise NotImplementedError
+
+    def iter_html(self):
+        # Walks the tree with an explicit stack instead of recursion, so deep
+        # trees cannot hit the recursion limit and no page-sized string is
+        # built unless the caller joins the chunks.
+        stack = [self]
+        while len(stack) > 0:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, ParentNode):
+                item.check_html()
+                yield f"<{item.tag}>"
+                stack.append(f"</{item.tag}>")
+                stack.extend(reversed(item.children))
+            else:
+                yield item.to_html()
+
+    def write_to(self, fp):
+        fp.writelines(self.iter_html())
     
     def props_to_html(self):
         if self.props is None:
@@ -23,6 +45,8 @@ class HTMLNode:
     
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -34,17 +58,16 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
     
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def check_html(self):
         if self.tag == None:
             raise ValueError("Invalid HTML: no tag")
         if self.children == None:
             raise ValueError("Invalid HTML: no children")
-        
-        all_children = ""
-        for child in self.children:
-            all_children += child.to_html()
-
-        return f"<{self.tag}>{all_children}</{self.tag}>"
\ No newline at end of file
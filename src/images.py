@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import struct
+
+import textnode
+from copystatic import copy_file, scan_files
+from manifest import hash_file, load_manifest, replaced_on_close, save_manifest
+from markdown_blocks import block_memo
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+image_extensions = [".png", ".jpg", ".jpeg", ".gif"]
+png_signature = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the dimensions; C4, C8 and CC share the range
+# but are tables and extensions.
+jpeg_sof_markers = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(path):
+    # (width, height) from the file header alone, or None if the format is
+    # not recognised or the header is cut short. Nothing is decoded.
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head[:8] == png_signature and head[12:16] == b"IHDR":
+            if len(head) < 24:
+                return None
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            if len(head) < 10:
+                return None
+            return struct.unpack("<HH", head[6:10])
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return jpeg_size(f)
+    return None
+
+
+def jpeg_size(f):
+    # Walks the segment headers up to the first start-of-frame, seeking over
+    # every segment body.
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if marker == b"":
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in jpeg_sof_markers:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            _, height, width = struct.unpack(">BHH", frame)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+class ImageIndex:
+    # Dimensions and downscaled variants of the site's images, keyed by the
+    # URL path they are served at ("/images/a.png"). Only site-absolute srcs
+    # can be looked up: rendered blocks are shared between pages, so a
+    # relative src has no single meaning.
+    def __init__(self, images=None):
+        self.images = images if images is not None else {}
+
+    def attributes(self, src):
+        props = {}
+        entry = self.images.get(src)
+        if entry is not None:
+            props["width"] = str(entry["width"])
+            props["height"] = str(entry["height"])
+            if len(entry["variants"]) > 0:
+                candidates = [f"{url} {width}w" for width, url in entry["variants"]]
+                candidates.append(f"{src} {entry['width']}w")
+                props["srcset"] = ", ".join(candidates)
+        props["loading"] = "lazy"
+        return props
+
+    def fingerprint(self):
+        text = json.dumps(self.images, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+    def page_fingerprint(self, srcs):
+        # Changes exactly when the attributes of one of the page's images do.
+        text = json.dumps([self.attributes(src) for src in srcs])
+        return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+active_index = None
+active_fingerprint = None
+
+
+def use_image_index(index):
+    # Installs index as textnode's image hook. Memoized blocks carry the old
+    # attributes, so they are dropped when the index changes. Installing the
+    # index that is already installed costs nothing.
+    global active_index, active_fingerprint
+    if index is not None and index is active_index:
+        return
+    fingerprint = None if index is None else index.fingerprint()
+    if fingerprint != active_fingerprint:
+        block_memo.clear()
+        active_fingerprint = fingerprint
+    active_index = index
+    textnode.image_resolver = None if index is None else index.attributes
+
+
+def page_image_fingerprint(srcs):
+    # page_fingerprint under the installed index, or None when there is no
+    # index or the page shows no images. srcs is only iterated with an index.
+    if active_index is None:
+        return None
+    srcs = list(srcs)
+    if len(srcs) == 0:
+        return None
+    return active_index.page_fingerprint(srcs)
+
+
+def index_images(
+    dir_path_static, dest_dir_path, manifest_path, dir_path_derivatives, variant_widths=None, sink=None
+):
+    # Reads every static image's dimensions and, with variant_widths and
+    # Pillow installed, writes narrower copies next to it in dest (or sink)
+    # as name-<width>w.ext. Headers are only re-read and variants only
+    # resized when an image's content changes; resized copies are kept in
+    # dir_path_derivatives by source hash.
+    if variant_widths is None or Image is None:
+        variant_widths = []
+    manifest = load_manifest(manifest_path)
+    old_images = manifest.get("images", {})
+    new_images = {}
+    stats = {"indexed": 0, "unchanged": 0, "resized": 0}
+
+    for rel_path, stat in scan_files(dir_path_static):
+        root, ext = os.path.splitext(rel_path)
+        if ext.lower() not in image_extensions:
+            continue
+        from_path = os.path.join(dir_path_static, rel_path)
+        old_entry = old_images.get(rel_path)
+        if (
+            old_entry is not None
+            and old_entry["size"] == stat.st_size
+            and old_entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            file_hash = old_entry["hash"]
+        else:
+            file_hash = hash_file(from_path)
+        if old_entry is not None and old_entry["hash"] == file_hash:
+            size = (old_entry["width"], old_entry["height"])
+            stats["unchanged"] += 1
+        else:
+            size = image_size(from_path)
+            if size is None:
+                continue
+            stats["indexed"] += 1
+        entry = {
+            "hash": file_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "width": size[0],
+            "height": size[1],
+            "variants": [],
+        }
+        for width in sorted(variant_widths):
+            if width >= entry["width"]:
+                continue
+            derivative_path = os.path.join(dir_path_derivatives, file_hash[:2], f"{file_hash}-{width}{ext}")
+            if not os.path.exists(derivative_path):
+                resize_image(from_path, derivative_path, width)
+                stats["resized"] += 1
+            variant_rel_path = f"{root}-{width}w{ext}"
+            dest_path = os.path.join(dest_dir_path, variant_rel_path)
+            if sink is not None:
+                if old_entry is None or old_entry["hash"] != file_hash or not sink.exists(dest_path):
+                    sink.copy_file(derivative_path, dest_path)
+            elif not os.path.exists(dest_path) or os.path.getsize(dest_path) != os.path.getsize(derivative_path):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                copy_file(derivative_path, dest_path)
+            entry["variants"].append([width, variant_rel_path])
+        new_images[rel_path] = entry
+
+    for rel_path, old_entry in old_images.items():
+        kept = set(path for _, path in new_images.get(rel_path, {}).get("variants", []))
+        for _, variant_rel_path in old_entry["variants"]:
+            dest_path = os.path.join(dest_dir_path, variant_rel_path)
+            if variant_rel_path in kept:
+                continue
+            if sink is not None:
+                if sink.exists(dest_path):
+                    sink.remove(dest_path)
+            elif os.path.exists(dest_path):
+                os.remove(dest_path)
+
+    save_manifest(manifest_path, {"images": new_images})
+    index = ImageIndex({
+        "/" + rel_path.replace(os.sep, "/"): {
+            "width": entry["width"],
+            "height": entry["height"],
+            "variants": [[width, "/" + path.replace(os.sep, "/")] for width, path in entry["variants"]],
+        }
+        for rel_path, entry in new_images.items()
+    })
+    return index, stats
+
+
+def variant_files(manifest):
+    # Output paths of the variants recorded in an index_images manifest.
+    return [path for entry in manifest.get("images", {}).values() for _, path in entry["variants"]]
+
+
+def resize_image(from_path, derivative_path, width):
+    with Image.open(from_path) as image, replaced_on_close(derivative_path, "wb") as f:
+        height = max(1, round(image.height * width / image.width))
+        image.resize((width, height), Image.LANCZOS).save(f, format=image.format)
@@ -0,0 +1,93 @@
+import os
+import posixpath
+import re
+import sys
+from urllib.parse import unquote
+
+from markdown_blocks import block_texts, block_type_code, classify_block, iter_blocks
+from textnode import iter_text_nodes, text_to_textnodes, text_type_image, text_type_link
+
+external_pattern = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*:|//)")
+
+
+def extract_targets(lines, links=True):
+    # Link and image URLs of one page, from the text nodes the renderer
+    # produces, so nothing in code or behind an escaped bracket counts. With
+    # links=False only images are collected. Only blocks that can hold a
+    # target are tokenized.
+    marker = "[" if links else "!["
+    link_urls = []
+    image_urls = []
+    for block in iter_blocks(lines):
+        if marker not in block:
+            continue
+        block_type, content, _ = classify_block(block)
+        if block_type == block_type_code:
+            continue
+        for text in block_texts(content):
+            try:
+                nodes = text_to_textnodes(text)
+            except Exception:
+                # Unclosed markup: the page fails when it is rendered.
+                continue
+            for node in iter_text_nodes(nodes):
+                if node.text_type == text_type_link and links:
+                    link_urls.append(node.url)
+                elif node.text_type == text_type_image:
+                    image_urls.append(node.url)
+    return link_urls, image_urls
+
+
+def resolve_target(url, page_path):
+    # The site-relative path url points at from the page at page_path, or
+    # None when it leaves the site or only names an anchor on the same page.
+    if external_pattern.match(url):
+        return None
+    url = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if url == "":
+        return None
+    if url.startswith("/"):
+        path = url.lstrip("/")
+    else:
+        path = posixpath.join(posixpath.dirname(page_path), url)
+    path = posixpath.normpath(path)
+    if path == ".":
+        return ""
+    return path
+
+
+def target_exists(path, site_files):
+    if path == "":
+        return "index.html" in site_files
+    return path in site_files or f"{path}/index.html" in site_files or f"{path}.html" in site_files
+
+
+def check_site_links(manifest, static_manifest, generated=()):
+    # One pass over the link index kept in the page manifest, against every
+    # generated page, copied static file and other generated file (feeds,
+    # search shards, image variants: paths relative to the output); nothing
+    # under ./public is read. Returns (broken, checked) where broken holds
+    # (source, kind, url).
+    pages = manifest.get("pages", {})
+    site_files = set(entry["dest"].replace(os.sep, "/") for entry in pages.values())
+    site_files.update(rel_path.replace(os.sep, "/") for rel_path in static_manifest.get("files", {}))
+    site_files.update(rel_path.replace(os.sep, "/") for rel_path in generated)
+    broken = []
+    checked = 0
+    for source, entry in sorted(pages.items()):
+        page_path = entry["dest"].replace(os.sep, "/")
+        for kind in ["links", "images"]:
+            for url in entry.get(kind, []):
+                path = resolve_target(url, page_path)
+                if path is None:
+                    continue
+                checked += 1
+                if not target_exists(path, site_files):
+                    broken.append((source, kind[:-1], url))
+    return broken, checked
+
+
+def report_broken_links(broken, checked, reporter):
+    for source, kind, url in broken:
+        print(f" ! {source}: broken {kind} {url}", file=sys.stderr)
+    reporter.status(f" * links: {checked} internal checked, {len(broken)} broken")
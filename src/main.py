@@ -1,25 +1,450 @@
+import argparse
+import contextlib
 import os
 import shutil
 
-from copystatic import copy_files_recursive
-from gencontent import generate_pages_recursive
+from compress import available_encoders, compress_files, compress_files_recursive, remove_compressed_files
+from copystatic import copy_modes, sync_files_recursive
+from daemon import RenderDaemon, serve_daemon
+from gencontent import generate_pages_incremental, generator_version
+from images import index_images, variant_files
+from linkindex import check_site_links, report_broken_links
+from manifest import load_manifest
+from pagecache import PageCache
+from publish import prepare_staging, publish, remove_public
+from search import remove_search_index, search_files, update_search_index
+from sinks import archive_suffixes, open_archive_sink
+from sitemap import feed_filenames, write_sitemap_and_feeds
+from tracing import BuildReporter, slowest_pages_table, write_chrome_trace
+from watch import SiteWatcher, watch
 
 dir_path_static = "./static"
 dir_path_public = "./public"
 dir_path_content = "./content"
+dir_path_cache = "./.cache"
 template_path = "./template.html"
+manifest_path = os.path.join(dir_path_cache, "manifest.json")
+static_manifest_path = os.path.join(dir_path_cache, "static.json")
+images_manifest_path = os.path.join(dir_path_cache, "images.json")
+compress_manifest_path = os.path.join(dir_path_cache, "compress.json")
+search_index_path = os.path.join(dir_path_cache, "search.json")
+dir_path_image_cache = os.path.join(dir_path_cache, "images")
+dir_path_page_cache = os.path.join(dir_path_cache, "pages")
 
 
 def main():
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+    parser = argparse.ArgumentParser(description="Build the static site into ./public")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep ./public, only re-render changed pages and only copy changed static files",
+    )
+    parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--static-mode",
+        choices=copy_modes,
+        default="copy",
+        help="how static files reach ./public: copy, hardlink (no data copied, shares inodes"
+        " with ./static) or reflink (copy-on-write clone where the filesystem supports it)",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="build into a sibling directory and atomically swap it in as ./public when the build"
+        " succeeds; with --incremental, unchanged files are hardlinked from the live site",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        help="write the site straight into an archive instead of ./public, in the format its suffix"
+        f" names ({', '.join(archive_suffixes)}); nothing is staged on disk",
+    )
+    parser.add_argument(
+        "--no-image-attributes",
+        action="store_true",
+        help="do not add width, height and loading=\"lazy\" to images from ./static",
+    )
+    parser.add_argument(
+        "--image-variants",
+        metavar="WIDTHS",
+        help="comma-separated widths of downscaled copies to offer in srcset (needs Pillow)",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages whose front matter says draft: true",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="public base URL of the site; writes sitemap.xml, atom.xml and rss.xml",
+    )
+    parser.add_argument(
+        "--feed-size",
+        type=int,
+        default=20,
+        metavar="N",
+        help="with --site-url, the number of most recently changed pages in the feeds (default 20)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded client-side search index to ./public/search",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed .gz siblings (and .br / .zst when brotli / zstandard are installed)"
+        " for HTML and other text files",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=1024,
+        metavar="BYTES",
+        help="with --compress, leave files smaller than this uncompressed (default 1024)",
+    )
+    parser.add_argument(
+        "--no-page-cache",
+        action="store_true",
+        help="always parse markdown instead of reusing rendered bodies from .cache/pages",
+    )
+    parser.add_argument(
+        "--page-cache-size",
+        type=int,
+        default=512,
+        metavar="MB",
+        help="evict least recently used cached bodies beyond this size (default 512)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes for rendering pages (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="render on one thread while reader and writer threads overlap the file I/O (ignores --jobs)",
+    )
+    parser.add_argument("--readers", type=int, default=4, help="reader threads for --pipeline (default 4)")
+    parser.add_argument("--writers", type=int, default=4, help="writer threads for --pipeline (default 4)")
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="pages buffered between --pipeline stages (default 64)",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that point at no generated page or static file",
+    )
+    parser.add_argument(
+        "--fail-on-broken-links",
+        action="store_true",
+        help="like --check-links, but fail the build (and with --staged, do not publish) if any are broken",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_true", help="print nothing but errors")
+    verbosity.add_argument("-v", "--verbose", action="store_true", help="print one line per page")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="record per-page stage timings and write them as Chrome trace-event JSON",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        metavar="N",
+        help="with --trace, list the N slowest pages at the end of the build (default 10)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, rebuild on changes and serve ./public with live reload",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="after building, keep templates and caches warm and serve a local render/rebuild API",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="with --daemon, listen on this Unix socket instead of 127.0.0.1:PORT",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=4,
+        metavar="N",
+        help="with --daemon, requests handled at once; others wait, then get 503 (default 4)",
+    )
+    parser.add_argument("--port", type=int, default=8888, help="port for --watch and --daemon (default 8888)")
+    args = parser.parse_args()
+    if args.archive is not None:
+        for name, value in [
+            ("--staged", args.staged),
+            ("--compress", args.compress),
+            ("--watch", args.watch),
+            ("--daemon", args.daemon),
+        ]:
+            if value:
+                parser.error(f"{name} cannot be combined with --archive")
+    for name, value in [("--readers", args.readers), ("--writers", args.writers)]:
+        if value < 1:
+            parser.error(f"{name} must be at least 1")
 
-    print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+    mode = "progress"
+    if args.quiet:
+        mode = "quiet"
+    elif args.verbose:
+        mode = "verbose"
+    reporter = BuildReporter(mode, tracing=args.trace is not None)
 
-    print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public)
+    _, images = build(args, reporter)
 
+    if args.daemon or args.watch:
+        # Changes are rendered one page at a time into ./public with the warm
+        # caches below; a full incremental build only runs for changes that
+        # reach every page, and never stages, since the targeted updates go
+        # straight to the live site.
+        rebuild_args = argparse.Namespace(**dict(vars(args), incremental=True, staged=False, trace=None, slowest=0))
+        rebuild = lambda: build(rebuild_args, BuildReporter("quiet"))
+        refresh = lambda outputs, pages: refresh_outputs(args, outputs, pages)
+        cache = None
+        if not args.no_page_cache:
+            cache = PageCache(dir_path_page_cache, generator_version, args.page_cache_size << 20)
+        if args.daemon:
+            daemon = RenderDaemon(
+                dir_path_content,
+                dir_path_static,
+                template_path,
+                dir_path_public,
+                manifest_path,
+                static_manifest_path,
+                cache,
+                images,
+                args.max_concurrent,
+                args.drafts,
+                rebuild,
+                refresh,
+            )
+            serve_daemon(daemon, args.port, args.socket)
+        elif args.watch:
+            watcher = SiteWatcher(
+                dir_path_content,
+                dir_path_static,
+                template_path,
+                dir_path_public,
+                manifest_path,
+                args.drafts,
+                rebuild,
+                refresh,
+                cache,
+                images,
+            )
+            watch(watcher, args.port)
 
-main()
+
+def refresh_outputs(args, outputs, pages):
+    # After the watcher or daemon updated outputs (paths in ./public, changed
+    # or removed), brings what build() derives from them up to date. The
+    # sitemap and feeds are only rewritten if they change, search only
+    # re-reads changed pages, and only those files are compressed again.
+    outputs = list(outputs)
+    if pages and args.site_url is not None:
+        write_sitemap_and_feeds(dir_path_public, load_manifest(manifest_path), args.site_url, args.feed_size)
+        outputs += feed_filenames
+    if pages and args.search:
+        update_search_index(dir_path_content, dir_path_public, load_manifest(manifest_path), search_index_path)
+        outputs += search_files(load_manifest(search_index_path))
+    if args.compress:
+        compress_files(dir_path_public, compress_manifest_path, outputs, args.compress_min_size)
+
+
+def build(args, reporter):
+    build_dir_path = dir_path_public
+    build_manifest_path = manifest_path
+    build_static_manifest_path = static_manifest_path
+    build_images_manifest_path = images_manifest_path
+    build_compress_manifest_path = compress_manifest_path
+    build_search_index_path = search_index_path
+    sink = None
+    manifest_paths = [
+        manifest_path,
+        static_manifest_path,
+        images_manifest_path,
+        compress_manifest_path,
+        search_index_path,
+    ]
+    if args.staged:
+        # Until the staging directory is published, the manifests describe it
+        # rather than the live site, so they are staged alongside it.
+        build_manifest_path = manifest_path + ".staging"
+        build_static_manifest_path = static_manifest_path + ".staging"
+        build_images_manifest_path = images_manifest_path + ".staging"
+        build_compress_manifest_path = compress_manifest_path + ".staging"
+        build_search_index_path = search_index_path + ".staging"
+        staged_manifest_paths = [
+            build_manifest_path,
+            build_static_manifest_path,
+            build_images_manifest_path,
+            build_compress_manifest_path,
+            build_search_index_path,
+        ]
+        for path, staged_path in zip(manifest_paths, staged_manifest_paths):
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+            if args.incremental and os.path.exists(path):
+                shutil.copyfile(path, staged_path)
+        build_dir_path = prepare_staging(dir_path_public, seed=args.incremental)
+        reporter.status(f"Staging build in {build_dir_path}...")
+    elif args.archive is not None:
+        # An archive starts empty every time, and so do its manifests; they
+        # are kept apart from the ones describing ./public.
+        build_manifest_path = manifest_path + ".archive"
+        build_static_manifest_path = static_manifest_path + ".archive"
+        build_images_manifest_path = images_manifest_path + ".archive"
+        build_compress_manifest_path = compress_manifest_path + ".archive"
+        build_search_index_path = search_index_path + ".archive"
+        for path in [
+            build_manifest_path,
+            build_static_manifest_path,
+            build_images_manifest_path,
+            build_compress_manifest_path,
+            build_search_index_path,
+        ]:
+            if os.path.exists(path):
+                os.remove(path)
+        sink = open_archive_sink(args.archive, dir_path_public)
+        reporter.status(f"Writing {args.archive}...")
+    elif not args.incremental:
+        reporter.status("Deleting public directory...")
+        remove_public(dir_path_public)
+        for path in manifest_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # The archive replaces any earlier one at its path only when the build
+    # succeeds; a failed build aborts it and leaves nothing behind.
+    with contextlib.nullcontext() if sink is None else sink:
+        reporter.status("Copying static files to public directory...")
+        static_stats = sync_files_recursive(
+            dir_path_static, build_dir_path, build_static_manifest_path, args.hash_static, args.static_mode, sink=sink
+        )
+        reporter.status(
+            f" * static: {static_stats['copied']} copied, {static_stats['unchanged']} unchanged,"
+            f" {static_stats['removed']} removed"
+        )
+
+        images = None
+        if not args.no_image_attributes:
+            variant_widths = None
+            if args.image_variants:
+                variant_widths = [int(width) for width in args.image_variants.split(",")]
+            images, stats = index_images(
+                dir_path_static, build_dir_path, build_images_manifest_path, dir_path_image_cache, variant_widths, sink
+            )
+            reporter.status(
+                f" * images: {stats['indexed']} indexed, {stats['unchanged']} unchanged, {stats['resized']} resized"
+            )
+
+        cache = None
+        if not args.no_page_cache:
+            # Entries are keyed by their page's image attributes as well as its
+            # source, so one image changing does not invalidate the rest.
+            cache = PageCache(dir_path_page_cache, generator_version, args.page_cache_size << 20)
+
+        pipeline = None
+        if args.pipeline:
+            pipeline = {"readers": args.readers, "writers": args.writers, "queue_size": args.queue_size}
+
+        check_links = args.check_links or args.fail_on_broken_links
+        reporter.status("Generating content...")
+        try:
+            generate_pages_incremental(
+                dir_path_content,
+                template_path,
+                build_dir_path,
+                build_manifest_path,
+                args.jobs,
+                reporter,
+                cache,
+                pipeline,
+                images,
+                args.drafts,
+                sink,
+                check_links,
+            )
+        finally:
+            if args.trace is not None:
+                write_chrome_trace(reporter.traces, args.trace)
+                reporter.status(f"Wrote trace for {len(reporter.traces)} page(s) to {args.trace}")
+                if args.slowest > 0 and len(reporter.traces) > 0:
+                    print(slowest_pages_table(reporter.traces, args.slowest))
+
+        if args.site_url is not None:
+            stats = write_sitemap_and_feeds(
+                build_dir_path, load_manifest(build_manifest_path), args.site_url, args.feed_size, sink
+            )
+            reporter.status(f" * sitemap and feeds: {stats['written']} written, {stats['unchanged']} unchanged")
+
+        if args.search:
+            stats = update_search_index(
+                dir_path_content, build_dir_path, load_manifest(build_manifest_path), build_search_index_path, sink
+            )
+            reporter.status(
+                f" * search: {stats['indexed']} indexed, {stats['unchanged']} unchanged,"
+                f" {stats['written']} shard(s) written, {stats['removed']} removed"
+            )
+        elif os.path.exists(build_search_index_path):
+            remove_search_index(build_dir_path, build_search_index_path)
+
+        if args.compress:
+            stats = compress_files_recursive(build_dir_path, build_compress_manifest_path, args.compress_min_size)
+            encodings = ", ".join(sorted(available_encoders()))
+            reporter.status(
+                f" * compress ({encodings}): {stats['compressed']} compressed, {stats['unchanged']} unchanged,"
+                f" {stats['removed']} removed"
+            )
+        elif os.path.exists(build_compress_manifest_path):
+            remove_compressed_files(build_dir_path, build_compress_manifest_path)
+
+        if check_links:
+            generated = search_files(load_manifest(build_search_index_path))
+            if images is not None:
+                generated += variant_files(load_manifest(build_images_manifest_path))
+            if args.site_url is not None:
+                generated += feed_filenames
+            broken, checked = check_site_links(
+                load_manifest(build_manifest_path), load_manifest(build_static_manifest_path), generated
+            )
+            report_broken_links(broken, checked, reporter)
+            if args.fail_on_broken_links and len(broken) > 0:
+                raise Exception(f"{len(broken)} broken internal link(s), first: {broken[0][0]}: {broken[0][2]}")
+
+    if sink is not None:
+        reporter.status(f"Wrote {args.archive}")
+
+    if args.staged:
+        # Publish before committing the manifests: if this is interrupted in
+        # between, the next build re-renders a few pages rather than trusting
+        # a manifest for output that never went live.
+        publish(build_dir_path, dir_path_public)
+        for path, staged_path in zip(manifest_paths, staged_manifest_paths):
+            if os.path.exists(staged_path):
+                os.replace(staged_path, path)
+        reporter.status(f"Published {build_dir_path} as {dir_path_public}")
+    return {"static": static_stats, "pages": reporter.done}, images
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def save_manifest(path, manifest):
+    with replaced_on_close(path) as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+@contextmanager
+def replaced_on_close(path, mode="w"):
+    # Every file the build writes goes through here: it is written under a
+    # temporary name unique to this process and thread, then renamed over
+    # path. Readers never see a half-written file, and a path hardlinked into
+    # a staged build is replaced instead of written through.
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    complete = False
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        complete = True
+        os.replace(tmp_path, path)
+    finally:
+        if not complete and os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -1,5 +1,10 @@
+import sys
+import threading
+from collections import OrderedDict
+
 from htmlnode import ParentNode
 from textnode import *
+from tracing import count_nodes
 
 block_type_paragraph = "paragraph"
 block_type_heading = "heading"
@@ -11,70 +16,225 @@ block_type_ulist = "unordered_list"
 
 
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    true_blocks = []
-    for block in blocks:
-        if block == "":
+    return list(iter_blocks(markdown.split("\n")))
+
+
+def iter_blocks(lines):
+    # Lines can come straight from a file handle, so only the current block is
+    # ever held in memory. A fence opened at the start of a block runs to the
+    # closing fence, blank lines included.
+    block = []
+    in_fence = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if in_fence:
+            block.append(line)
+            if line.startswith("```"):
+                in_fence = False
+                yield "\n".join(block).strip()
+                block = []
+            continue
+        if line.strip() == "":
+            if len(block) > 0:
+                yield "\n".join(block).strip()
+                block = []
             continue
-        true_blocks.append(block.strip())
-    return true_blocks
+        if len(block) == 0 and line.startswith("```") and "```" not in line[3:]:
+            in_fence = True
+        block.append(line)
+    if len(block) > 0:
+        yield "\n".join(block).strip()
+
+
+def iter_typed_blocks(lines):
+    for block in iter_blocks(lines):
+        yield block, block_to_block_type(block)
+
 
 def block_to_block_type(block):
-    lines = block.split("\n")
-    if block.startswith(("#", "##", "###", "####", "#####", "######")):
-        return block_type_heading
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return block_type_code
-    if block.startswith(">"):
-        for line in lines:
-            if not line.startswith(">"):
-                return block_type_paragraph
-        return block_type_quote
-    if block.startswith("* "):
-        for line in lines:
-            if not line.startswith("* "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("- "):
-        for line in lines:
-            if not line.startswith("- "):
-                return block_type_paragraph
-        return block_type_ulist
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return block_type_paragraph
-            i += 1
-        return block_type_olist
+    # Type only: types with a matcher are asked without extracting their
+    # content, and the block is split into lines only for those without one.
+    lines = None
+    for block_type, detect, build in block_candidates.get(block[:1], generic_candidates):
+        matches = block_matchers.get(block_type)
+        if matches is not None:
+            if matches(block):
+                return block_type
+            continue
+        if lines is None:
+            lines = block.split("\n")
+        if detect(block, lines) is not None:
+            return block_type
     return block_type_paragraph
 
+
+def classify_block(block):
+    # Splits the block into lines once and tries only the block types that
+    # can start with its first character; the detector that matches also
+    # extracts the content its builder needs, so no later pass re-splits it.
+    candidates = block_candidates.get(block[:1], generic_candidates)
+    if len(candidates) == 0:
+        return block_type_paragraph, block.replace("\n", " "), paragraph_to_html_node
+    lines = block.split("\n")
+    for block_type, detect, build in candidates:
+        content = detect(block, lines)
+        if content is not None:
+            return block_type, content, build
+    return block_type_paragraph, " ".join(lines), paragraph_to_html_node
+
+
+def register_block_type(block_type, detect, build, first_chars=None, first=False, matches=None):
+    # detect(block, lines) returns the content for build(content), or None if
+    # the block is not of this type. first_chars limits which blocks are even
+    # offered to detect; None offers every block. Types are tried in
+    # registration order, or ahead of the others with first=True. matches
+    # (block) is an optional cheaper test block_to_block_type uses instead of
+    # detect when only the type is wanted.
+    entry = (block_type, detect, build)
+    block_matchers.pop(block_type, None)
+    if matches is not None:
+        block_matchers[block_type] = matches
+    if first:
+        block_registry.insert(0, (entry, first_chars))
+    else:
+        block_registry.append((entry, first_chars))
+    rebuild_block_candidates()
+
+
+def unregister_block_type(block_type):
+    block_registry[:] = [registered for registered in block_registry if registered[0][0] != block_type]
+    block_matchers.pop(block_type, None)
+    rebuild_block_candidates()
+
+
+def rebuild_block_candidates():
+    block_candidates.clear()
+    generic_candidates.clear()
+    chars = set()
+    for _, registered_chars in block_registry:
+        if registered_chars is not None:
+            chars.update(registered_chars)
+    for char in chars:
+        block_candidates[char] = [
+            registered for registered, registered_chars in block_registry
+            if registered_chars is None or char in registered_chars
+        ]
+    for registered, registered_chars in block_registry:
+        if registered_chars is None:
+            generic_candidates.append(registered)
+
+
+block_registry = []
+block_matchers = {}
+block_candidates = {}
+generic_candidates = []
+
+
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
+    for block in iter_blocks(markdown.split("\n")):
+        html_node = build_block(block)
         children.append(html_node)
     return ParentNode("div", children, None)
 
 
-def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+def iter_markdown_html(lines, memo=None):
+    # Same output as markdown_to_html_node(...).iter_html(), but built one
+    # block at a time so the whole document tree never exists at once.
+    yield "<div>"
+    for block in iter_blocks(lines):
+        if memo is None:
+            yield from build_block(block).iter_html()
+        else:
+            yield memo.render(block)
+    yield "</div>"
+
+
+class BlockMemo:
+    # Rendered HTML for recently seen block texts, so boilerplate repeated
+    # across pages (disclaimers, shared lists, code samples) is classified and
+    # inline-parsed once per process. Least recently used blocks are dropped
+    # once the stored text passes max_bytes. Each entry also keeps the number
+    # of nodes its block rendered to, for traces.
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def render(self, block, block_type=None):
+        return self.entry(block, block_type)[0]
+
+    def entry(self, block, block_type=None):
+        # (html, nodes) for the block, rendered on a miss.
+        entry = self.lookup(block)
+        if entry is None:
+            node = block_to_html_node(block, block_type)
+            entry = self.store(block, node.to_html(), count_nodes(node))
+        return entry
+
+    def lookup(self, block):
+        with self.lock:
+            entry = self.entries.get(block)
+            if entry is not None:
+                self.entries.move_to_end(block)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store(self, block, html, nodes):
+        entry = (html, nodes)
+        with self.lock:
+            if block not in self.entries:
+                self.entries[block] = entry
+                self.size += len(block) + len(html)
+                while self.size > self.max_bytes:
+                    old_block, (old_html, _) = self.entries.popitem(last=False)
+                    self.size -= len(old_block) + len(old_html)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __repr__(self):
+        return f"BlockMemo({len(self.entries)} blocks, {self.size} bytes, {self.hits} hits, {self.misses} misses)"
+
+
+block_memo = BlockMemo()
+
+
+def block_to_html_node(block, block_type=None):
+    if block_type is None:
+        return build_block(block)
     if block_type == block_type_paragraph:
-        return paragraph_to_html_node(block)
-    if block_type == block_type_heading:
-        return heading_to_html_node(block)
-    if block_type == block_type_code:
-        return code_to_html_node(block)
-    if block_type == block_type_olist:
-        return olist_to_html_node(block)
-    if block_type == block_type_ulist:
-        return ulist_to_html_node(block)
-    if block_type == block_type_quote:
-        return quote_to_html_node(block)
+        return paragraph_to_html_node(" ".join(block.split("\n")))
+    for registered_type, detect, build in block_candidates.get(block[:1], generic_candidates):
+        if registered_type == block_type:
+            content = detect(block, block.split("\n"))
+            if content is not None:
+                return build(content)
     raise ValueError("Invalid block type")
 
 
+def build_block(block):
+    block_type, content, build = classify_block(block)
+    return build(content)
+
+
+def block_texts(content):
+    # The inline markdown in a classify_block content: detectors hand back a
+    # string, a list of item strings, or a tuple such as a heading's
+    # (level, text).
+    if isinstance(content, str):
+        return [content]
+    return [part for part in content if isinstance(part, str)]
+
+
 def text_to_children(text):
     text_nodes = text_to_textnodes(text)
     children = []
@@ -84,25 +244,42 @@ def text_to_children(text):
     return children
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
-    paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
+def paragraph_to_html_node(text):
+    children = text_to_children(text)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def detect_heading(block, lines):
     level = 0
     for char in block:
         if char == "#":
             level += 1
         else:
             break
-    if level + 1 >= len(block):
+    return level, block[level + 1 :]
+
+
+def match_heading(block):
+    return True
+
+
+def heading_to_html_node(content):
+    level, text = content
+    if text == "":
         raise ValueError(f"Invalid heading level: {level}")
-    text = block[level + 1 :]
     children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    return ParentNode(sys.intern(f"h{level}"), children)
+
+
+def detect_code(block, lines):
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return block
+    return None
+
+
+def match_code(block):
+    last = block.rfind("\n")
+    return last != -1 and block.startswith("```") and block.startswith("```", last + 1)
 
 
 def code_to_html_node(block):
@@ -114,33 +291,84 @@ def code_to_html_node(block):
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def detect_quote(block, lines):
+    new_lines = []
+    for line in lines:
+        if not line.startswith(">"):
+            return None
+        new_lines.append(line.lstrip(">").strip())
+    return " ".join(new_lines)
+
+
+def match_quote(block):
+    return block.count("\n") == block.count("\n>")
+
+
+def quote_to_html_node(text):
+    children = text_to_children(text)
+    return ParentNode("blockquote", children)
+
+
+def detect_ulist(block, lines):
+    marker = block[:2]
+    if marker != "* " and marker != "- ":
+        return None
+    items = []
+    for line in lines:
+        if not line.startswith(marker):
+            return None
+        items.append(line[2:])
+    return items
+
+
+def match_ulist(block):
+    marker = block[:2]
+    if marker != "* " and marker != "- ":
+        return False
+    return block.count("\n") == block.count("\n" + marker)
+
+
+def ulist_to_html_node(items):
     html_items = []
     for item in items:
-        text = item[3:]
-        children = text_to_children(text)
+        children = text_to_children(item)
         html_items.append(ParentNode("li", children))
-    return ParentNode("ol", html_items)
+    return ParentNode("ul", html_items)
+
+
+def detect_olist(block, lines):
+    items = []
+    i = 1
+    for line in lines:
+        marker = f"{i}. "
+        if not line.startswith(marker):
+            return None
+        items.append(line[len(marker) :])
+        i += 1
+    return items
+
+
+def match_olist(block):
+    pos = 0
+    i = 1
+    while block.startswith(f"{i}. ", pos):
+        pos = block.find("\n", pos) + 1
+        if pos == 0:
+            return True
+        i += 1
+    return False
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(items):
     html_items = []
     for item in items:
-        text = item[2:]
-        children = text_to_children(text)
+        children = text_to_children(item)
         html_items.append(ParentNode("li", children))
-    return ParentNode("ul", html_items)
+    return ParentNode("ol", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
-    new_lines = []
-    for line in lines:
-        if not line.startswith(">"):
-            raise ValueError("Invalid quote block")
-        new_lines.append(line.lstrip(">").strip())
-    content = " ".join(new_lines)
-    children = text_to_children(content)
-    return ParentNode("blockquote", children)
\ No newline at end of file
+register_block_type(block_type_heading, detect_heading, heading_to_html_node, "#", matches=match_heading)
+register_block_type(block_type_code, detect_code, code_to_html_node, "`", matches=match_code)
+register_block_type(block_type_quote, detect_quote, quote_to_html_node, ">", matches=match_quote)
+register_block_type(block_type_ulist, detect_ulist, ulist_to_html_node, "*-", matches=match_ulist)
+register_block_type(block_type_olist, detect_olist, olist_to_html_node, "1", matches=match_olist)
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+from manifest import replaced_on_close
+
+
+class PageCache:
+    # Rendered page bodies on disk, keyed by the source's content hash under a
+    # directory per generator version. Each entry is the title on the first
+    # line followed by the body HTML. Reads refresh the file's mtime, so
+    # eviction can drop the least recently used entries first.
+    def __init__(self, dir_path, version, max_bytes=512 << 20):
+        self.dir_path = dir_path
+        self.version = version
+        self.max_bytes = max_bytes
+
+    def entry_path(self, source_hash):
+        return os.path.join(self.dir_path, self.version, source_hash[:2], source_hash + ".html")
+
+    def open(self, source_hash):
+        path = self.entry_path(source_hash)
+        try:
+            f = open(path, "r")
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return f
+
+    def put(self, source_hash, title, body):
+        for _ in self.tee(source_hash, title, [body]):
+            pass
+
+    def tee(self, source_hash, title, chunks):
+        # Passes chunks through while copying them into the cache. The entry
+        # only appears once every chunk has been written.
+        with replaced_on_close(self.entry_path(source_hash)) as f:
+            f.write(title + "\n")
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+
+    def evict(self):
+        if os.path.isdir(self.dir_path):
+            for name in os.listdir(self.dir_path):
+                if name != self.version:
+                    shutil.rmtree(os.path.join(self.dir_path, name), ignore_errors=True)
+        entries = []
+        total = 0
+        version_dir = os.path.join(self.dir_path, self.version)
+        if not os.path.isdir(version_dir):
+            return 0
+        for shard in os.scandir(version_dir):
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+
+done = object()
+
+
+def run_pipeline(tasks, read, render, write, readers=4, writers=4, queue_size=64):
+    # read(task) and write(task, rendered) run on I/O threads; render(task, item)
+    # runs on the calling thread. Bounded queues between the stages keep at
+    # most queue_size items in flight on either side of render, so reading
+    # ahead never outruns memory. Returns (task, error) pairs in completion
+    # order plus queue depth and utilization stats.
+    if readers < 1 or writers < 1:
+        raise ValueError(f"Invalid pipeline threads: {readers} reader(s), {writers} writer(s)")
+    task_queue = queue.Queue()
+    read_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    results = []
+    results_lock = threading.Lock()
+    busy = {"read": 0.0, "render": 0.0, "write": 0.0}
+    busy_lock = threading.Lock()
+    depths = {"read": [], "write": []}
+    start = time.perf_counter()
+
+    def add_busy(stage, seconds):
+        with busy_lock:
+            busy[stage] += seconds
+
+    def read_worker():
+        while True:
+            task = task_queue.get()
+            if task is done:
+                read_queue.put(done)
+                return
+            began = time.perf_counter()
+            try:
+                item = read(task)
+                error = None
+            except Exception as e:
+                item = None
+                error = f"{type(e).__name__}: {e}"
+            add_busy("read", time.perf_counter() - began)
+            read_queue.put((task, item, error))
+
+    def write_worker():
+        while True:
+            entry = write_queue.get()
+            if entry is done:
+                return
+            task, rendered = entry
+            began = time.perf_counter()
+            try:
+                write(task, rendered)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            add_busy("write", time.perf_counter() - began)
+            with results_lock:
+                results.append((task, error))
+
+    for task in tasks:
+        task_queue.put(task)
+    for _ in range(readers):
+        task_queue.put(done)
+    threads = [threading.Thread(target=read_worker, daemon=True) for _ in range(readers)]
+    threads += [threading.Thread(target=write_worker, daemon=True) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+
+    starved = 0.0
+    finished_readers = 0
+    while finished_readers < readers:
+        waited = time.perf_counter()
+        entry = read_queue.get()
+        starved += time.perf_counter() - waited
+        if entry is done:
+            finished_readers += 1
+            continue
+        depths["read"].append(read_queue.qsize())
+        task, item, error = entry
+        if error is not None:
+            with results_lock:
+                results.append((task, error))
+            continue
+        began = time.perf_counter()
+        try:
+            rendered = render(task, item)
+        except Exception as e:
+            busy["render"] += time.perf_counter() - began
+            with results_lock:
+                results.append((task, f"{type(e).__name__}: {e}"))
+            continue
+        busy["render"] += time.perf_counter() - began
+        write_queue.put((task, rendered))
+        depths["write"].append(write_queue.qsize())
+
+    for _ in range(writers):
+        write_queue.put(done)
+    for thread in threads:
+        thread.join()
+
+    wall = time.perf_counter() - start
+    stats = {
+        "wall": wall,
+        "readers": readers,
+        "writers": writers,
+        "queue_size": queue_size,
+        "render_starved": starved,
+    }
+    for stage, workers in [("read", readers), ("render", 1), ("write", writers)]:
+        stats[f"{stage}_busy"] = busy[stage]
+        stats[f"{stage}_utilization"] = busy[stage] / (wall * workers) if wall > 0 else 0.0
+    for stage in ["read", "write"]:
+        samples = depths[stage]
+        stats[f"{stage}_queue_max"] = max(samples) if len(samples) > 0 else 0
+        stats[f"{stage}_queue_mean"] = sum(samples) / len(samples) if len(samples) > 0 else 0.0
+    return results, stats
+
+
+def format_pipeline_stats(stats):
+    # Mostly-full read queue and idle readers: rendering is the bottleneck.
+    # Empty read queue and a starved render thread: add readers.
+    return "\n".join([
+        f" * pipeline: {stats['wall'] * 1000:.1f} ms wall, render starved for {stats['render_starved'] * 1000:.1f} ms",
+        f" * read:   {stats['readers']} thread(s), {stats['read_utilization'] * 100:.0f}% busy,"
+        f" queue max {stats['read_queue_max']}/{stats['queue_size']} mean {stats['read_queue_mean']:.1f}",
+        f" * render: 1 thread, {stats['render_utilization'] * 100:.0f}% busy",
+        f" * write:  {stats['writers']} thread(s), {stats['write_utilization'] * 100:.0f}% busy,"
+        f" queue max {stats['write_queue_max']}/{stats['queue_size']} mean {stats['write_queue_mean']:.1f}",
+    ])
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+from copystatic import copy_files_recursive
+
+# A staged build goes into one of two sibling generation directories and
+# ./public becomes a symlink to the newest; swapping the symlink with a rename
+# is atomic, so readers always see one complete site or the other.
+generation_suffixes = [".a", ".b"]
+
+
+def generation_dir_paths(dir_path_public):
+    return [dir_path_public + suffix for suffix in generation_suffixes]
+
+
+def live_dir_path(dir_path_public):
+    # The directory the site is currently served from, or None if there is
+    # no site yet.
+    if os.path.islink(dir_path_public):
+        return os.path.join(os.path.dirname(dir_path_public), os.readlink(dir_path_public))
+    if os.path.isdir(dir_path_public):
+        return dir_path_public
+    return None
+
+
+def prepare_staging(dir_path_public, seed=True):
+    # Picks the generation that is not live, empties it, and with seed
+    # hardlinks every file of the live site into it. Build steps then only
+    # replace what changed; they must never write through a hardlink.
+    live = live_dir_path(dir_path_public)
+    first, second = generation_dir_paths(dir_path_public)
+    staging = first
+    if live is not None and os.path.normpath(live) == os.path.normpath(first):
+        staging = second
+    if os.path.lexists(staging):
+        shutil.rmtree(staging)
+    if seed and live is not None:
+        copy_files_recursive(live, staging, mode="hardlink")
+    else:
+        os.makedirs(staging)
+    return staging
+
+
+def publish(staging, dir_path_public):
+    # The previous generation is kept until the next staged build starts, so
+    # requests still reading it can finish.
+    if os.path.isdir(dir_path_public) and not os.path.islink(dir_path_public):
+        # Moving from a plain directory to a symlink cannot be one rename;
+        # this only happens on the first staged build.
+        old = [path for path in generation_dir_paths(dir_path_public) if path != staging][0]
+        if os.path.lexists(old):
+            shutil.rmtree(old)
+        os.rename(dir_path_public, old)
+    link_path = dir_path_public + ".link"
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.basename(staging), link_path)
+    os.replace(link_path, dir_path_public)
+
+
+def remove_public(dir_path_public):
+    # Removes the site whether ./public is a plain directory or a symlink to
+    # staged generations.
+    if os.path.islink(dir_path_public):
+        os.remove(dir_path_public)
+    elif os.path.isdir(dir_path_public):
+        shutil.rmtree(dir_path_public)
+    for path in generation_dir_paths(dir_path_public):
+        if os.path.lexists(path):
+            shutil.rmtree(path)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import re
+
+from frontmatter import read_front_matter
+from gencontent import page_url
+from manifest import load_manifest, save_manifest
+from markdown_blocks import block_texts, block_type_code, classify_block, iter_blocks
+from sinks import file_sink
+from textnode import text_to_textnodes
+
+search_dir_name = "search"
+token_pattern = re.compile(r"\w+")
+min_term_length = 2
+title_weight = 10
+# Bumped whenever shard_name or the shard format changes; an index written
+# under another version is rebuilt and its old shard files removed.
+index_version = 2
+
+
+def page_terms(lines, title=None):
+    # Term -> weight for one page body (lines after its front matter), from
+    # the same text nodes the renderer produces, so markup and link URLs are
+    # never indexed. Code blocks are left out; a term in the title counts
+    # title_weight times. Lines can come straight from a file handle.
+    terms = {}
+    for block in iter_blocks(lines):
+        block_type, content, _ = classify_block(block)
+        if block_type == block_type_code:
+            continue
+        for text in block_texts(content):
+            for node in text_to_textnodes(text):
+                add_terms(terms, node.text, 1)
+    if title is not None:
+        add_terms(terms, title, title_weight)
+    return terms
+
+
+def add_terms(terms, text, weight):
+    for token in token_pattern.findall(text.lower()):
+        if len(token) >= min_term_length:
+            terms[token] = terms.get(token, 0) + weight
+
+
+def shard_name(term):
+    # The first character of a term picks its shard, so a small site gets a
+    # few dozen shards rather than one per two-letter prefix; anything
+    # outside [a-z0-9] is spelled as _<hex> so names stay portable. A client
+    # applies the same rule to a query term and fetches search/<name>.json.
+    char = term[0]
+    return char if char.isascii() and char.isalnum() else f"_{ord(char):x}"
+
+
+def update_search_index(dir_path_content, dest_dir_path, manifest, index_path, sink=None):
+    # Pages keep a stable id across builds, so a change only rebuilds and
+    # rewrites the shards of the terms it touched; the rest keep their
+    # recorded digest and are never serialized. Sources are re-read
+    # (streamed, once) only when their hash in the page manifest changed
+    # since the last index update; titles come from the manifest. Rendering
+    # itself does not index: pages served from the page cache or block memo
+    # never rebuild their text nodes, and pages render in worker processes.
+    # Writes search/pages.json (id -> [url, title], null for freed ids) and
+    # one search/<shard>.json per shard ({term: [[id, weight], ...]}).
+    if sink is None:
+        sink = file_sink
+    index = load_manifest(index_path)
+    old_shards = index.get("shards", {})
+    dirty = set()
+    if index.get("version") != index_version:
+        index = {}
+        dirty.update(old_shards)
+    old_pages = index.get("pages", {})
+    next_id = index.get("next_id", 0)
+    new_pages = {}
+    stats = {"indexed": 0, "unchanged": 0, "written": 0, "removed": 0}
+
+    for key, entry in sorted(manifest.get("pages", {}).items()):
+        old_entry = old_pages.get(key)
+        if old_entry is not None and old_entry["hash"] == entry["hash"] and old_entry["dest"] == entry["dest"]:
+            new_pages[key] = old_entry
+            stats["unchanged"] += 1
+            continue
+        with open(os.path.join(dir_path_content, key), "r") as f:
+            _, lines = read_front_matter(f)
+            terms = page_terms(lines, entry.get("title"))
+        if old_entry is not None:
+            page_id = old_entry["id"]
+            dirty.update(shard_name(term) for term in old_entry["terms"])
+        else:
+            page_id = next_id
+            next_id += 1
+        new_pages[key] = {
+            "id": page_id,
+            "hash": entry["hash"],
+            "dest": entry["dest"],
+            "title": entry.get("title"),
+            "terms": terms,
+        }
+        dirty.update(shard_name(term) for term in terms)
+        dirty.add("pages")
+        stats["indexed"] += 1
+    for key, old_entry in old_pages.items():
+        if key not in new_pages:
+            dirty.update(shard_name(term) for term in old_entry["terms"])
+            dirty.add("pages")
+
+    search_dir_path = os.path.join(dest_dir_path, search_dir_name)
+    # A shard whose file went missing is rebuilt even if no posting changed.
+    for name in old_shards:
+        if name not in dirty and not sink.exists(os.path.join(search_dir_path, name + ".json")):
+            dirty.add(name)
+
+    files = {}
+    if "pages" in dirty:
+        titles = [None] * next_id
+        for entry in new_pages.values():
+            titles[entry["id"]] = [page_url(entry["dest"]), entry["title"]]
+        files["pages"] = titles
+    shards = {name: {} for name in dirty if name != "pages"}
+    for entry in new_pages.values():
+        for term, weight in entry["terms"].items():
+            terms = shards.get(shard_name(term))
+            if terms is not None:
+                terms.setdefault(term, []).append([entry["id"], weight])
+    for name, terms in shards.items():
+        if len(terms) == 0:
+            continue
+        for postings in terms.values():
+            postings.sort(key=lambda posting: (-posting[1], posting[0]))
+        files[name] = dict(sorted(terms.items()))
+
+    new_shards = {name: digest for name, digest in old_shards.items() if name not in dirty}
+    for name, data in files.items():
+        text = json.dumps(data, separators=(",", ":"))
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        new_shards[name] = digest
+        path = os.path.join(search_dir_path, name + ".json")
+        if old_shards.get(name) == digest and sink.exists(path):
+            continue
+        with sink.open(path) as f:
+            f.write(text)
+        stats["written"] += 1
+    for name in old_shards:
+        path = os.path.join(search_dir_path, name + ".json")
+        if name not in new_shards and sink.exists(path):
+            sink.remove(path)
+            stats["removed"] += 1
+
+    save_manifest(
+        index_path, {"version": index_version, "next_id": next_id, "pages": new_pages, "shards": new_shards}
+    )
+    return stats
+
+
+def search_files(index):
+    # Output paths of the shards recorded in an update_search_index manifest.
+    return [os.path.join(search_dir_name, name + ".json") for name in index.get("shards", {})]
+
+
+def remove_search_index(dest_dir_path, index_path):
+    # An index left from an earlier build would go stale, so a build without
+    # search drops it.
+    for name in load_manifest(index_path).get("shards", {}):
+        path = os.path.join(dest_dir_path, search_dir_name, name + ".json")
+        if os.path.exists(path):
+            os.remove(path)
+    search_dir_path = os.path.join(dest_dir_path, search_dir_name)
+    if os.path.isdir(search_dir_path) and len(os.listdir(search_dir_path)) == 0:
+        os.rmdir(search_dir_path)
+    if os.path.exists(index_path):
+        os.remove(index_path)
@@ -0,0 +1,208 @@
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+
+from copystatic import copy_file
+from manifest import replaced_on_close
+
+# Archive suffix -> (sink class, tarfile compression).
+archive_suffixes = {
+    ".tar": ("tar", ""),
+    ".tar.gz": ("tar", "gz"),
+    ".tgz": ("tar", "gz"),
+    ".tar.bz2": ("tar", "bz2"),
+    ".tar.xz": ("tar", "xz"),
+    ".zip": ("zip", None),
+}
+
+
+class Sink:
+    # Where a build's output files go. Writers pass the dest path they would
+    # write on disk; sinks that are not the filesystem store it under its path
+    # relative to dir_path. Used as a context manager, a sink is closed when
+    # the build succeeds and aborted when it fails.
+    threads_only = False
+
+    def __init__(self, dir_path=""):
+        self.dir_path = dir_path
+
+    def name(self, dest_path):
+        return os.path.relpath(dest_path, self.dir_path).replace(os.sep, "/")
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FileSink(Sink):
+    # Files go straight to their dest paths: the behaviour without a sink.
+    def __init__(self, mode="copy"):
+        super().__init__()
+        self.mode = mode
+
+    def open(self, dest_path):
+        return replaced_on_close(dest_path)
+
+    def copy_file(self, from_path, dest_path, stat=None):
+        dir_path = os.path.dirname(dest_path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        copy_file(from_path, dest_path, self.mode, stat)
+
+    def exists(self, dest_path):
+        return os.path.exists(dest_path)
+
+    def remove(self, dest_path):
+        os.remove(dest_path)
+
+
+class MemorySink(Sink):
+    # Name -> bytes, for tests and previews. Lives in this process only, so
+    # pages are rendered here one at a time (or on --pipeline threads), never
+    # in worker processes.
+    threads_only = True
+
+    def __init__(self, dir_path=""):
+        super().__init__(dir_path)
+        self.files = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def open(self, dest_path):
+        f = io.StringIO()
+        yield f
+        with self.lock:
+            self.files[self.name(dest_path)] = f.getvalue().encode()
+
+    def copy_file(self, from_path, dest_path, stat=None):
+        with open(from_path, "rb") as f:
+            data = f.read()
+        with self.lock:
+            self.files[self.name(dest_path)] = data
+
+    def exists(self, dest_path):
+        return self.name(dest_path) in self.files
+
+    def remove(self, dest_path):
+        with self.lock:
+            del self.files[self.name(dest_path)]
+
+
+class ArchiveSink(Sink):
+    # Appends each file to an archive as it is finished, so nothing is
+    # staged on disk first. Generated files are spooled until complete (an
+    # entry's size comes before its data), in memory up to spool_size.
+    # Entries are appended one at a time; the archive is written to a
+    # temporary file, renamed to path by close() once the build succeeds and
+    # deleted by abort() when it fails.
+    threads_only = True
+    spool_size = 1 << 20
+
+    def __init__(self, path, dir_path=""):
+        super().__init__(dir_path)
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.mtime = int(time.time())
+        self.lock = threading.Lock()
+        self.names = set()
+
+    @contextmanager
+    def open(self, dest_path):
+        spool = SpooledTemporaryFile(max_size=self.spool_size)
+        with io.TextIOWrapper(spool, encoding="utf-8") as f:
+            yield f
+            f.flush()
+            size = spool.tell()
+            spool.seek(0)
+            with self.lock:
+                self.add_stream(self.name(dest_path), spool, size)
+                self.names.add(self.name(dest_path))
+
+    def copy_file(self, from_path, dest_path, stat=None):
+        with self.lock:
+            self.add_file(from_path, self.name(dest_path))
+            self.names.add(self.name(dest_path))
+
+    def exists(self, dest_path):
+        return self.name(dest_path) in self.names
+
+    def remove(self, dest_path):
+        raise ValueError(f"Cannot remove {dest_path} from a streamed archive")
+
+    def close(self):
+        self.archive.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.archive.close()
+        os.remove(self.tmp_path)
+
+
+class TarSink(ArchiveSink):
+    def __init__(self, path, dir_path="", compression=""):
+        super().__init__(path, dir_path)
+        # "w|" streams: the archive is never seeked, only appended to.
+        self.archive = tarfile.open(self.tmp_path, f"w|{compression}")
+
+    def add_stream(self, name, f, size):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = self.mtime
+        info.mode = 0o644
+        self.archive.addfile(info, f)
+
+    def add_file(self, from_path, name):
+        self.archive.add(from_path, arcname=name, recursive=False, filter=owner_free)
+
+
+def owner_free(info):
+    # The builder's user and group mean nothing where the archive is unpacked.
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+class ZipSink(ArchiveSink):
+    def __init__(self, path, dir_path=""):
+        super().__init__(path, dir_path)
+        self.archive = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+
+    def add_stream(self, name, f, size):
+        info = zipfile.ZipInfo(name, time.localtime(self.mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        with self.archive.open(info, "w") as to_file:
+            shutil.copyfileobj(f, to_file)
+
+    def add_file(self, from_path, name):
+        self.archive.write(from_path, name)
+
+
+def open_archive_sink(path, dir_path=""):
+    # The archive format follows path's suffix.
+    for suffix, (kind, compression) in archive_suffixes.items():
+        if path.endswith(suffix):
+            if kind == "zip":
+                return ZipSink(path, dir_path)
+            return TarSink(path, dir_path, compression)
+    raise ValueError(f"Unknown archive type: {path} (expected one of {', '.join(archive_suffixes)})")
+
+
+file_sink = FileSink()
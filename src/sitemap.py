@@ -0,0 +1,117 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from frontmatter import page_date
+from gencontent import page_url
+from manifest import replaced_on_close
+
+sitemap_filename = "sitemap.xml"
+atom_filename = "atom.xml"
+rss_filename = "rss.xml"
+feed_filenames = [sitemap_filename, atom_filename, rss_filename]
+
+
+def site_pages(manifest, site_url):
+    # (absolute url, title, date) for every page in the page manifest, sorted
+    # by url. The date is the front matter date, else the source mtime. The
+    # manifest already holds both, so no source or output file is opened.
+    site_url = site_url.rstrip("/")
+    pages = []
+    for entry in manifest.get("pages", {}).values():
+        updated = page_date(entry.get("meta", {}), entry["mtime_ns"])
+        pages.append((site_url + page_url(entry["dest"]), entry.get("title") or "", updated))
+    pages.sort()
+    return pages
+
+
+def newest_pages(pages, count):
+    return sorted(pages, key=lambda page: (page[2], page[0]), reverse=True)[:count]
+
+
+def sitemap_xml(pages):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for url, _, updated in pages:
+        lines.append(f"<url><loc>{escape(url)}</loc><lastmod>{updated.isoformat()}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def atom_xml(pages, site_url, title, count=20):
+    entries = newest_pages(pages, count)
+    updated = entries[0][2] if len(entries) > 0 else datetime.fromtimestamp(0, timezone.utc)
+    site_url = site_url.rstrip("/") + "/"
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(title)}</title>",
+        f'<link href="{escape(site_url)}"/>',
+        f'<link rel="self" href="{escape(site_url + atom_filename)}"/>',
+        f"<id>{escape(site_url)}</id>",
+        f"<updated>{updated.isoformat()}</updated>",
+    ]
+    for url, page_title, page_updated in entries:
+        lines.append(
+            f'<entry><title>{escape(page_title)}</title><link href="{escape(url)}"/>'
+            f"<id>{escape(url)}</id><updated>{page_updated.isoformat()}</updated></entry>"
+        )
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def rss_xml(pages, site_url, title, count=20):
+    site_url = site_url.rstrip("/") + "/"
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0"><channel>',
+        f"<title>{escape(title)}</title>",
+        f"<link>{escape(site_url)}</link>",
+        f"<description>{escape(title)}</description>",
+    ]
+    for url, page_title, page_updated in newest_pages(pages, count):
+        lines.append(
+            f"<item><title>{escape(page_title)}</title><link>{escape(url)}</link>"
+            f"<guid>{escape(url)}</guid><pubDate>{format_datetime(page_updated)}</pubDate></item>"
+        )
+    lines.append("</channel></rss>")
+    return "\n".join(lines) + "\n"
+
+
+def write_if_changed(path, text, sink=None):
+    # Unchanged files keep their mtime, so incremental deploys and the
+    # --compress pass skip them. A sink always gets the file.
+    if sink is not None:
+        with sink.open(path) as f:
+            f.write(text)
+        return True
+    data = text.encode()
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    with replaced_on_close(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def write_sitemap_and_feeds(dest_dir_path, manifest, site_url, feed_size=20, sink=None):
+    # The feed title is the site's home page title.
+    pages = site_pages(manifest, site_url)
+    title = site_url
+    for entry in manifest.get("pages", {}).values():
+        if entry["dest"] == "index.html" and entry.get("title"):
+            title = entry["title"]
+    stats = {"written": 0, "unchanged": 0}
+    for filename, text in [
+        (sitemap_filename, sitemap_xml(pages)),
+        (atom_filename, atom_xml(pages, site_url, title, feed_size)),
+        (rss_filename, rss_xml(pages, site_url, title, feed_size)),
+    ]:
+        if write_if_changed(os.path.join(dest_dir_path, filename), text, sink):
+            stats["written"] += 1
+        else:
+            stats["unchanged"] += 1
+    return stats
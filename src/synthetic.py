@@ -0,0 +1,79 @@
+import os
+import random
+
+words = (
+    "elf ring hobbit wizard mountain river forest shadow light journey road"
+    " tower king queen sword song dragon gold map star night morning stone"
+).split()
+
+
+def generate_corpus(
+    dir_path_content,
+    pages=100,
+    paragraphs=10,
+    depth=2,
+    fanout=4,
+    link_density=0.05,
+    image_density=0.01,
+    emphasis_density=0.05,
+    seed=0,
+):
+    # Deterministic for a given seed, so runs with the same settings always
+    # benchmark exactly the same bytes.
+    rng = random.Random(seed)
+    page_paths = []
+    for i in range(pages):
+        dir_path = dir_path_content
+        for level in range(depth):
+            dir_path = os.path.join(dir_path, f"section{(i // fanout ** (depth - level)) % fanout}")
+        os.makedirs(dir_path, exist_ok=True)
+        page_path = os.path.join(dir_path, f"page{i}.md")
+        markdown = make_page(rng, i, pages, paragraphs, link_density, image_density, emphasis_density)
+        with open(page_path, "w") as f:
+            f.write(markdown)
+        page_paths.append(page_path)
+    return page_paths
+
+
+def generate_static(dir_path_static, files=50, size=16 * 1024, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(dir_path_static, "images"), exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(dir_path_static, "images", f"image{i}.bin"), "wb") as f:
+            f.write(rng.randbytes(size))
+
+
+def make_page(rng, index, pages, paragraphs, link_density, image_density, emphasis_density):
+    blocks = [f"# Page {index}"]
+    for i in range(paragraphs):
+        kind = i % 5
+        if kind == 0:
+            blocks.append(f"## Section {i}")
+            blocks.append(make_text(rng, 60, pages, link_density, image_density, emphasis_density))
+        elif kind == 1:
+            items = [f"* {make_text(rng, 8, pages, link_density, 0, emphasis_density)}" for _ in range(4)]
+            blocks.append("\n".join(items))
+        elif kind == 2:
+            items = [f"{n}. {make_text(rng, 8, pages, link_density, 0, emphasis_density)}" for n in range(1, 5)]
+            blocks.append("\n".join(items))
+        elif kind == 3:
+            blocks.append(f"> {make_text(rng, 30, pages, 0, 0, emphasis_density)}")
+        else:
+            blocks.append("```\n" + "\n".join(" ".join(rng.choices(words, k=6)) for _ in range(5)) + "\n```")
+    return "\n\n".join(blocks) + "\n"
+
+
+def make_text(rng, length, pages, link_density, image_density, emphasis_density):
+    parts = []
+    for _ in range(length):
+        word = rng.choice(words)
+        roll = rng.random()
+        if roll < link_density:
+            parts.append(f"[{word}](/page{rng.randrange(pages)})")
+        elif roll < link_density + image_density:
+            parts.append(f"![{word}](/images/{word}.png)")
+        elif roll < link_density + image_density + emphasis_density:
+            parts.append(rng.choice([f"**{word}**", f"*{word}*", f"`{word}`"]))
+        else:
+            parts.append(word)
+    return " ".join(parts)
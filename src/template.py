@@ -0,0 +1,58 @@
+import re
+
+template_filename = "template.html"
+placeholder_pattern = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    def __init__(self, text):
+        self.literals = []
+        self.names = []
+        pos = 0
+        for match in placeholder_pattern.finditer(text):
+            self.literals.append(text[pos : match.start()])
+            self.names.append(match.group(1))
+            pos = match.end()
+        self.literals.append(text[pos:])
+        self.repeated = set(name for name in self.names if self.names.count(name) > 1)
+
+    def render(self, values):
+        return "".join(self.iter_chunks(values))
+
+    def iter_chunks(self, values):
+        # A value may be a string or an iterable of string chunks (such as
+        # HTMLNode.iter_html()), which is streamed through without joining.
+        values = dict(values)
+        for name in self.repeated:
+            if name in values and not isinstance(values[name], str):
+                values[name] = "".join(values[name])
+        yield self.literals[0]
+        for name, literal in zip(self.names, self.literals[1:]):
+            value = values.get(name, "")
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield literal
+
+    def write_to(self, fp, values):
+        fp.writelines(self.iter_chunks(values))
+
+    def __repr__(self):
+        return f"Template({self.names})"
+
+
+template_cache = {}
+
+
+def load_template(path):
+    template = template_cache.get(path)
+    if template is None:
+        with open(path, "r") as f:
+            template = Template(f.read())
+        template_cache[path] = template
+    return template
+
+
+def clear_template_cache():
+    template_cache.clear()
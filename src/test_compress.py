@@ -0,0 +1,69 @@
+import gzip
+import os
+import unittest
+
+from compress import compress_files, compress_files_recursive, gzip_compress, remove_compressed_files
+from testsupport import SiteFixture
+
+
+class TestCompressFiles(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("compress.json")
+        self.write("index.html", "<p>hello</p>" * 200)
+        self.write(os.path.join("blog", "index.html"), "<p>blog</p>" * 200)
+        self.write("tiny.css", "a{}")
+        self.write("image.png", "x" * 5000)
+
+    def write(self, rel_path, text):
+        # Relative to the output directory.
+        super().write(os.path.join(self.public, rel_path), text)
+
+    def compress(self):
+        return compress_files_recursive(self.public, self.manifest, min_size=100, encoders={".gz": gzip_compress})
+
+    def test_compresses_text_files_above_threshold(self):
+        self.assertEqual(self.compress(), {"compressed": 2, "unchanged": 0, "removed": 0})
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 200)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "image.png.gz")))
+
+    def test_only_changed_files_are_recompressed(self):
+        self.compress()
+        self.write("index.html", "<p>changed</p>" * 200)
+        self.assertEqual(self.compress(), {"compressed": 1, "unchanged": 1, "removed": 0})
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 200)
+
+    def test_stale_siblings_are_removed(self):
+        self.compress()
+        os.remove(os.path.join(self.public, "blog", "index.html"))
+        self.assertEqual(self.compress(), {"compressed": 0, "unchanged": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html.gz")))
+        self.assertEqual(remove_compressed_files(self.public, self.manifest), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html.gz")))
+
+    def test_compress_named_files_only(self):
+        self.compress()
+        self.write("index.html", "<p>changed</p>" * 200)
+        self.write(os.path.join("blog", "index.html"), "<p>not named</p>" * 200)
+        os.remove(os.path.join(self.public, "image.png"))
+        stats = compress_files(
+            self.public, self.manifest, ["index.html", "image.png"], min_size=100, encoders={".gz": gzip_compress}
+        )
+        self.assertEqual(stats, {"compressed": 1, "unchanged": 0, "removed": 0})
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 200)
+        with gzip.open(os.path.join(self.public, "blog", "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>blog</p>" * 200)
+        # The next full pass still sees the file that was not named.
+        self.assertEqual(self.compress(), {"compressed": 1, "unchanged": 1, "removed": 0})
+        os.remove(os.path.join(self.public, "index.html"))
+        stats = compress_files(self.public, self.manifest, ["index.html"], min_size=100, encoders={".gz": gzip_compress})
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
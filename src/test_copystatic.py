@@ -0,0 +1,88 @@
+import os
+import unittest
+
+from copystatic import copy_files_recursive, scan_files, sync_files_recursive
+from testsupport import SiteFixture
+
+
+class TestSyncFiles(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("cache", "static.json")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, use_hash=False):
+        return sync_files_recursive(self.static, self.public, self.manifest, use_hash)
+
+    def test_first_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.read("images", "a.png"), "png")
+
+    def test_second_sync_copies_only_changes(self):
+        self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 1, "unchanged": 1, "removed": 0})
+
+    def test_removed_files_are_deleted(self):
+        self.sync()
+        self.write(os.path.join(self.public, "page.html"), "generated")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 0, "unchanged": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "page.html")))
+
+    def test_already_deleted_is_not_counted(self):
+        self.sync()
+        os.remove(os.path.join(self.public, "images", "a.png"))
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 0, "unchanged": 1, "removed": 0})
+
+    def test_hash_mode_ignores_touch(self):
+        self.sync(use_hash=True)
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+        stats = self.sync(use_hash=True)
+        self.assertEqual(stats["copied"], 0)
+
+
+class TestCopyEngine(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        for rel_path in ["a.txt", os.path.join("b", "b.txt"), os.path.join("b", "c", "c.txt")]:
+            self.write(os.path.join(self.static, rel_path), rel_path * 1000)
+
+    def test_scan_files(self):
+        rel_paths = [rel_path for rel_path, _ in scan_files(self.static)]
+        self.assertEqual(rel_paths, ["a.txt", os.path.join("b", "b.txt"), os.path.join("b", "c", "c.txt")])
+
+    def check_copy(self, mode):
+        dest = self.path(mode)
+        copy_files_recursive(self.static, dest, mode)
+        for rel_path, stat in scan_files(self.static):
+            with open(os.path.join(dest, rel_path)) as f:
+                self.assertEqual(f.read(), rel_path * 1000)
+            self.assertEqual(os.stat(os.path.join(dest, rel_path)).st_mtime_ns, stat.st_mtime_ns)
+        return dest
+
+    def test_copy(self):
+        dest = self.check_copy("copy")
+        self.assertNotEqual(os.stat(os.path.join(dest, "a.txt")).st_ino, os.stat(os.path.join(self.static, "a.txt")).st_ino)
+
+    def test_hardlink(self):
+        dest = self.check_copy("hardlink")
+        self.assertEqual(os.stat(os.path.join(dest, "a.txt")).st_ino, os.stat(os.path.join(self.static, "a.txt")).st_ino)
+
+    def test_reflink_falls_back(self):
+        self.check_copy("reflink")
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            copy_files_recursive(self.static, self.path("x"), "symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
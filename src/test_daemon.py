@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import unittest
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+
+from daemon import DaemonHandler, RenderDaemon
+from manifest import load_manifest
+from testsupport import SiteFixture
+
+
+class TestRenderDaemon(SiteFixture, unittest.TestCase):
+    template_text = "<title>{{ Title }}</title>{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(self.static)
+        os.makedirs(self.public)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.daemon = RenderDaemon(
+            self.content,
+            self.static,
+            self.template,
+            self.public,
+            self.path("manifest.json"),
+            self.path("static.json"),
+            max_concurrent=2,
+        )
+        handler = type("TestHandler", (DaemonHandler,), {"daemon": self.daemon, "slot_timeout": 0.1})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def request(self, method, path, body=None):
+        connection = HTTPConnection("127.0.0.1", self.server.server_address[1])
+        connection.request(method, path, body)
+        response = connection.getresponse()
+        text = response.read().decode()
+        connection.close()
+        return response, text
+
+    def test_render_markdown(self):
+        response, text = self.request("POST", "/render", "---\ndraft: true\n---\n# Preview\n\nSome *text*")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(text, "<title>Preview</title><div><h1>Preview</h1><p>Some <i>text</i></p></div>")
+        self.assertIsNotNone(response.getheader("X-Render-Time-Ms"))
+
+    def test_render_picks_up_template_change(self):
+        self.request("POST", "/render", "# One")
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        os.utime(self.template, ns=(1, 1))
+        _, text = self.request("POST", "/render", "# Two")
+        self.assertEqual(text, "<h1>Two</h1>")
+
+    def test_render_without_title(self):
+        response, _ = self.request("POST", "/render", "no heading")
+        self.assertEqual(response.status, 400)
+
+    def test_rebuild_path(self):
+        response, text = self.request("POST", "/rebuild?path=index.md")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(text)["dest"], os.path.join(self.public, "index.html"))
+        self.assertIn("<p>Hello</p>", self.read("index.html"))
+
+    def test_rebuild_draft_removes_output(self):
+        self.request("POST", "/rebuild?path=index.md")
+        self.write(os.path.join(self.content, "index.md"), "---\ndraft: true\n---\n# Home")
+        response, text = self.request("POST", "/rebuild?path=index.md")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(text), {"dest": None, "draft": True})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_rebuild_missing_path(self):
+        response, _ = self.request("POST", "/rebuild?path=missing.md")
+        self.assertEqual(response.status, 404)
+
+    def test_paths_outside_content_are_rejected(self):
+        outside = self.path("outside.md")
+        self.write(outside, "# Outside")
+        for path in ["../outside.md", "blog/../../outside.md", outside]:
+            response, _ = self.request("POST", f"/rebuild?path={path}")
+            self.assertEqual(response.status, 404)
+            response, _ = self.request("POST", f"/render?path={path}", "# Preview")
+            self.assertEqual(response.status, 404)
+        self.assertFalse(os.path.exists(self.path("outside.html")))
+        self.assertEqual(os.listdir(self.public), [])
+
+    def test_rebuild_all(self):
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        response, text = self.request("POST", "/rebuild-all")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(text)["static"]["copied"], 1)
+        self.assertEqual(self.read("index.css"), "body {}")
+        self.assertIn("<p>Hello</p>", self.read("index.html"))
+
+    def test_rebuild_function(self):
+        builds = []
+        refreshes = []
+        self.daemon.rebuild = lambda: builds.append(1) or ({"pages": len(builds)}, None)
+        self.daemon.refresh = lambda outputs, pages: refreshes.append((outputs, pages))
+        _, text = self.request("POST", "/rebuild?path=index.md")
+        self.assertEqual(json.loads(text), {"dest": os.path.join(self.public, "index.html"), "draft": False})
+        # One page only goes through the targeted path, then refreshes its outputs.
+        self.assertEqual(builds, [])
+        self.assertEqual(refreshes, [(["index.html"], True)])
+        _, text = self.request("POST", "/rebuild-all")
+        self.assertEqual(json.loads(text), {"pages": 1})
+        response, _ = self.request("POST", "/rebuild?path=../outside.md")
+        self.assertEqual(response.status, 404)
+        self.assertEqual((len(builds), len(refreshes)), (1, 1))
+
+    def test_rebuild_path_updates_manifest(self):
+        self.request("POST", "/rebuild?path=index.md")
+        pages = load_manifest(self.daemon.manifest_path)["pages"]
+        self.assertEqual(pages["index.md"]["dest"], "index.html")
+        self.write(os.path.join(self.content, "index.md"), "---\ndraft: true\n---\n# Home")
+        self.request("POST", "/rebuild?path=index.md")
+        self.assertEqual(load_manifest(self.daemon.manifest_path)["pages"], {})
+
+    def test_busy_returns_503(self):
+        self.daemon.slots.acquire()
+        self.daemon.slots.acquire()
+        try:
+            response, _ = self.request("POST", "/render", "# Busy")
+        finally:
+            self.daemon.slots.release()
+            self.daemon.slots.release()
+        self.assertEqual(response.status, 503)
+        self.assertEqual(self.daemon.stats_report()["rejected"], 1)
+
+    def test_stats(self):
+        self.request("POST", "/render", "# One")
+        self.request("POST", "/render", "no heading")
+        _, text = self.request("GET", "/stats")
+        stats = json.loads(text)["endpoints"]["/render"]
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["errors"], 1)
+        self.assertGreaterEqual(stats["max_ms"], stats["mean_ms"])
+
+    def test_unknown_endpoint(self):
+        response, _ = self.request("POST", "/nope")
+        self.assertEqual(response.status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
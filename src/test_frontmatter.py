@@ -0,0 +1,69 @@
+import io
+import os
+import unittest
+
+from frontmatter import page_date, read_front_matter, read_front_matter_file, template_values
+from gencontent import extract_title
+from testsupport import SiteFixture
+
+
+class TestReadFrontMatter(unittest.TestCase):
+    def test_yaml_subset(self):
+        meta, lines = read_front_matter(
+            "---\ntitle: 'Quoted: title'\n# comment\ndraft: false\ntags: [elves, \"rings\"]\n---\n# Body".split("\n")
+        )
+        self.assertEqual(meta, {"title": "Quoted: title", "draft": False, "tags": ["elves", "rings"]})
+        self.assertEqual(list(lines), ["# Body"])
+
+    def test_toml_style(self):
+        meta, lines = read_front_matter(["+++", 'date = "2024-03-01"', "+++", "text"])
+        self.assertEqual(meta, {"date": "2024-03-01"})
+        self.assertEqual(list(lines), ["text"])
+
+    def test_no_front_matter(self):
+        meta, lines = read_front_matter(["# Title", "", "text"])
+        self.assertEqual(meta, {})
+        self.assertEqual(list(lines), ["# Title", "", "text"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            read_front_matter(["---", "title: x"])
+        with self.assertRaises(ValueError):
+            read_front_matter(["---", "no separator", "---"])
+
+    def test_header_only(self):
+        f = io.StringIO("---\ntitle: x\n---\n" + "body\n" * 1000)
+        meta, _ = read_front_matter(f)
+        self.assertEqual(meta, {"title": "x"})
+        self.assertEqual(f.readline(), "body\n")
+
+    def test_title(self):
+        self.assertEqual(extract_title("---\ntitle: Meta\n---\n# Heading"), "Meta")
+        self.assertEqual(extract_title("---\n# a comment\n---\n# Heading"), "Heading")
+
+    def test_values(self):
+        self.assertEqual(
+            template_values({"description": "d", "tags": ["a", "b"], "draft": True}),
+            {"Description": "d", "Tags": "a, b", "Draft": "true"},
+        )
+        self.assertEqual(page_date({"date": "2024-01-02"}).isoformat(), "2024-01-02T00:00:00+00:00")
+        self.assertEqual(page_date({"date": "soon"}, 0).year, 1970)
+
+
+class TestReadFrontMatterFile(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        for path, text in [
+            ("old.md", "---\ndate: 2020-01-01\n---\n# Old"),
+            (os.path.join("blog", "new.md"), "---\ndate: 2024-01-01\n---\n# New"),
+            ("draft.md", "---\ndate: 2025-01-01\ndraft: true\n---\n# Draft"),
+        ]:
+            self.write(os.path.join(self.content, path), text)
+
+    def test_reads_header_only(self):
+        self.assertEqual(read_front_matter_file(os.path.join(self.content, "old.md"))["date"], "2020-01-01")
+        self.assertEqual(read_front_matter_file(os.path.join(self.content, "draft.md"))["draft"], True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import os
 import unittest
 
-from gencontent import extract_title
+from gencontent import extract_title, generate_pages_incremental, generate_pages_recursive
+from manifest import hash_file, load_manifest, save_manifest
+from pagecache import PageCache
+from testsupport import SiteFixture
+from tracing import BuildReporter
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +51,171 @@ no title
             pass
 
 
+class TestGeneratePagesIncremental(SiteFixture, unittest.TestCase):
+    template_text = "<title>{{ Title }}</title>{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("cache", "manifest.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+
+    def build(self):
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest)
+
+    def mtimes(self):
+        return {
+            name: os.stat(os.path.join(self.public, name)).st_mtime_ns
+            for name in ["index.html", os.path.join("blog", "index.html")]
+        }
+
+    def touch_outputs(self):
+        for name in ["index.html", os.path.join("blog", "index.html")]:
+            os.utime(os.path.join(self.public, name), ns=(0, 0))
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        self.touch_outputs()
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.build()
+        mtimes = self.mtimes()
+        self.assertNotEqual(mtimes["index.html"], 0)
+        self.assertEqual(mtimes[os.path.join("blog", "index.html")], 0)
+        self.assertEqual(self.read("index.html"), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        self.touch_outputs()
+        self.write(self.template, "{{ Title }}|{{ Content }}")
+        self.build()
+        self.assertNotIn(0, self.mtimes().values())
+
+    def test_generator_change_rebuilds_all(self):
+        self.build()
+        self.touch_outputs()
+        manifest = load_manifest(self.manifest)
+        manifest["generator_version"] = "1"
+        for entry in manifest["pages"].values():
+            entry["title"] = "stale"
+        save_manifest(self.manifest, manifest)
+        self.build()
+        self.assertNotIn(0, self.mtimes().values())
+        self.assertEqual(load_manifest(self.manifest)["pages"]["index.md"]["title"], "Home")
+
+    def test_directory_template_override(self):
+        self.write(os.path.join(self.content, "blog", "template.html"), "blog: {{ Title }}")
+        self.build()
+        self.assertEqual(self.read("blog", "index.html"), "blog: Blog")
+        self.assertEqual(self.read("index.html"), "<title>Home</title><div><h1>Home</h1></div>")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "template.html")))
+
+    def test_rewrite_replaces_hardlinked_output(self):
+        self.build()
+        linked = self.path("linked.html")
+        os.link(os.path.join(self.public, "index.html"), linked)
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.build()
+        with open(linked) as f:
+            self.assertEqual(f.read(), "<title>Home</title><div><h1>Home</h1></div>")
+
+    def test_front_matter_and_drafts(self):
+        self.write(self.template, "<title>{{ Title }}</title><meta content=\"{{ Description }}\">{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "---\ndescription: Hi\n---\n# Home")
+        self.build()
+        self.assertEqual(self.read("index.html"), '<title>Home</title><meta content="Hi"><div><h1>Home</h1></div>')
+        self.write(os.path.join(self.content, "blog", "index.md"), "---\ndraft: true\n---\n# Blog")
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+
+    def test_manifest_entry(self):
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "---\ntags: [a, b]\n---\nIntro [x](/blog/)\n\n```\n# not the title\n[y](/nope)\n```\n\n# Home\n\n![i](/a.png)",
+        )
+        self.build()
+        entry = load_manifest(self.manifest)["pages"]["index.md"]
+        self.assertEqual(entry["hash"], hash_file(os.path.join(self.content, "index.md")))
+        self.assertEqual(entry["meta"], {"tags": ["a", "b"]})
+        self.assertNotIn("links", entry)
+        self.assertEqual(entry["images"], ["/a.png"])
+        # The same rule as the rendered page's title: the first "# " line.
+        self.assertEqual(entry["title"], "not the title")
+        # Links are only extracted for the link check, even for an unchanged page.
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest, links=True)
+        entry = load_manifest(self.manifest)["pages"]["index.md"]
+        self.assertEqual(entry["links"], ["/blog/"])
+
+    def test_removed_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+class TestGeneratePagesParallel(SiteFixture, unittest.TestCase):
+    template_text = "<title>{{ Title }}</title>{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        for i in range(6):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\nSome *text* for page {i}")
+
+    def read_outputs(self, dest):
+        outputs = {}
+        for filename in sorted(os.listdir(dest)):
+            with open(os.path.join(dest, filename)) as f:
+                outputs[filename] = f.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        serial = self.path("serial")
+        parallel = self.path("parallel")
+        generate_pages_recursive(self.content, self.template, serial, jobs=1)
+        generate_pages_recursive(self.content, self.template, parallel, jobs=3)
+        self.assertEqual(self.read_outputs(serial), self.read_outputs(parallel))
+        self.assertEqual(len(self.read_outputs(parallel)), 6)
+
+    def test_pipeline_matches_serial(self):
+        serial = self.path("serial")
+        piped = self.path("piped")
+        cache = PageCache(self.path("cache"), "1")
+        pipeline = {"readers": 2, "writers": 2, "queue_size": 2}
+        generate_pages_recursive(self.content, self.template, serial, jobs=1)
+        generate_pages_recursive(self.content, self.template, piped, cache=cache, pipeline=pipeline)
+        self.assertEqual(self.read_outputs(serial), self.read_outputs(piped))
+        # Second run is served from the page cache the first one filled.
+        generate_pages_recursive(self.content, self.template, piped, cache=cache, pipeline=pipeline)
+        self.assertEqual(self.read_outputs(serial), self.read_outputs(piped))
+
+    def test_pipeline_traces_stages(self):
+        public = self.public
+        reporter = BuildReporter("quiet", tracing=True)
+        generate_pages_recursive(self.content, self.template, public, reporter=reporter, pipeline={})
+        self.assertEqual(len(reporter.traces), 6)
+        for trace in reporter.traces:
+            self.assertEqual([stage for stage, _, _ in trace.stages], ["read", "render", "write"])
+            self.assertGreaterEqual(trace.total_ns(), sum(duration for _, _, duration in trace.stages))
+            self.assertGreater(trace.counts["nodes"], trace.counts["blocks"])
+            self.assertGreater(trace.counts["bytes_out"], 0)
+
+    def test_page_errors_are_reported(self):
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        dest = self.public
+        with self.assertRaises(Exception) as cm:
+            generate_pages_recursive(self.content, self.template, dest, jobs=2)
+        self.assertIn("broken.md", str(cm.exception))
+        self.assertEqual(len(self.read_outputs(dest)), 6)
+
+    def test_broken_front_matter_fails_one_page(self):
+        self.write(os.path.join(self.content, "broken.md"), "---\nno separator\n---\n# Broken")
+        dest = self.public
+        with self.assertRaises(Exception) as cm:
+            generate_pages_recursive(self.content, self.template, dest)
+        self.assertIn("1 page(s) failed", str(cm.exception))
+        self.assertIn("broken.md", str(cm.exception))
+        self.assertEqual(len(self.read_outputs(dest)), 6)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
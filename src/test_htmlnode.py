@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -89,6 +90,35 @@ class TestHTMLNode(unittest.TestCase):
         )
 
         self.assertEqual(node.to_html(), "<p><b>Bold text</b><p2>Normal text<i>italic text</i></p2>Normal text</p>")
+    def test_parent_to_html_deep(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertTrue(html.endswith("</span></span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("deep"))
+
+    def test_write_to(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, " tail")]),
+                LeafNode("a", "link", {"href": "/x"}),
+            ],
+        )
+        fp = io.StringIO()
+        node.write_to(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+        self.assertEqual(fp.getvalue(), '<div><p><b>Bold text</b> tail</p><a href="/x">link</a></div>')
+
+    def test_parent_no_children(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+    def test_nodes_have_no_dict(self):
+        self.assertFalse(hasattr(LeafNode("b", "x"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", []), "__dict__"))
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
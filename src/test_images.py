@@ -0,0 +1,92 @@
+import os
+import struct
+import unittest
+
+from images import Image, ImageIndex, image_size, index_images, use_image_index
+from testsupport import SiteFixture
+from textnode import TextNode, text_node_to_html_node, text_type_image
+
+
+def png_bytes(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+
+
+def jpeg_bytes(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+class TestImageSize(SiteFixture, unittest.TestCase):
+    def size_of(self, data):
+        path = self.path("image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png_bytes(1344, 896)), (1344, 896))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(b"GIF89a" + struct.pack("<HH", 40, 30) + b"\x00" * 16), (40, 30))
+
+    def test_jpeg(self):
+        self.assertEqual(self.size_of(jpeg_bytes(640, 480)), (640, 480))
+
+    def test_unknown(self):
+        self.assertIsNone(self.size_of(b"not an image at all"))
+        self.assertIsNone(self.size_of(b"\xff\xd8\xff\xd9"))
+
+    def test_truncated(self):
+        self.assertIsNone(self.size_of(png_bytes(1344, 896)[:20]))
+        self.assertIsNone(self.size_of(b"GIF89a\x28"))
+        self.assertIsNone(self.size_of(jpeg_bytes(640, 480)[:25]))
+
+
+class TestImageIndex(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("images.json")
+        self.derivatives = self.path("derivatives")
+        os.makedirs(os.path.join(self.static, "images"))
+        with open(os.path.join(self.static, "images", "a.png"), "wb") as f:
+            f.write(png_bytes(100, 50))
+        self.write(os.path.join(self.static, "style.css"), "body {}")
+
+    def tearDown(self):
+        use_image_index(None)
+        super().tearDown()
+
+    def test_index_is_cached(self):
+        index, stats = index_images(self.static, self.public, self.manifest, self.derivatives)
+        self.assertEqual(stats, {"indexed": 1, "unchanged": 0, "resized": 0})
+        self.assertEqual(
+            index.attributes("/images/a.png"), {"width": "100", "height": "50", "loading": "lazy"}
+        )
+        again, stats = index_images(self.static, self.public, self.manifest, self.derivatives)
+        self.assertEqual(stats, {"indexed": 0, "unchanged": 1, "resized": 0})
+        self.assertEqual(again.fingerprint(), index.fingerprint())
+
+    def test_image_nodes_get_attributes(self):
+        node = TextNode("alt", text_type_image, "/images/a.png")
+        use_image_index(ImageIndex({"/images/a.png": {"width": 100, "height": 50, "variants": [[50, "/images/a-50w.png"]]}}))
+        self.assertEqual(
+            text_node_to_html_node(node).to_html(),
+            '<img src="/images/a.png" alt="alt" width="100" height="50"'
+            ' srcset="/images/a-50w.png 50w, /images/a.png 100w" loading="lazy"></img>',
+        )
+        use_image_index(None)
+        self.assertEqual(text_node_to_html_node(node).to_html(), '<img src="/images/a.png" alt="alt"></img>')
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_variants(self):
+        with open(os.path.join(self.static, "images", "b.png"), "wb") as f:
+            Image.new("RGB", (100, 50)).save(f, format="PNG")
+        index, stats = index_images(self.static, self.public, self.manifest, self.derivatives, [40, 200])
+        self.assertEqual(stats["resized"], 1)
+        self.assertEqual(image_size(os.path.join(self.public, "images", "b-40w.png")), (40, 20))
+        self.assertIn("srcset", index.attributes("/images/b.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
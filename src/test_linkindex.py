@@ -0,0 +1,61 @@
+import os
+import unittest
+
+from linkindex import check_site_links, extract_targets, resolve_target
+
+
+class TestExtractTargets(unittest.TestCase):
+    def test_links_and_images(self):
+        markdown = """# Title
+
+A [link](/about) and ![img](/images/a.png) and `[code](/not-a-link)`.
+
+Not \\[escaped](/not-a-link) but **[bold](/bold)**.
+
+```
+[also code](/not-a-link)
+```
+
+* [item](other.html)
+"""
+        links, images = extract_targets(markdown.split("\n"))
+        self.assertEqual(links, ["/about", "/bold", "other.html"])
+        self.assertEqual(images, ["/images/a.png"])
+        self.assertEqual(extract_targets(markdown.split("\n"), links=False), ([], ["/images/a.png"]))
+
+
+class TestResolveTarget(unittest.TestCase):
+    def test_resolve(self):
+        self.assertEqual(resolve_target("/about", "blog/index.html"), "about")
+        self.assertEqual(resolve_target("post.html#top", "blog/index.html"), "blog/post.html")
+        self.assertEqual(resolve_target("../images/a%20b.png", "blog/index.html"), "images/a b.png")
+        self.assertEqual(resolve_target("/", "blog/index.html"), "")
+
+    def test_external_and_anchors_are_skipped(self):
+        for url in ["https://example.com/", "mailto:a@b.c", "//cdn.example.com/x.js", "#section"]:
+            self.assertIsNone(resolve_target(url, "index.html"))
+
+
+class TestCheckSiteLinks(unittest.TestCase):
+    def test_broken_links(self):
+        manifest = {
+            "pages": {
+                "index.md": {"dest": "index.html", "links": ["/blog", "/missing", "https://x.org"], "images": []},
+                "blog/index.md": {"dest": "blog/index.html", "links": ["/", "../index.html"], "images": ["../img.png"]},
+            }
+        }
+        static_manifest = {"files": {"style.css": {}}}
+        broken, checked = check_site_links(manifest, static_manifest)
+        self.assertEqual(broken, [("blog/index.md", "image", "../img.png"), ("index.md", "link", "/missing")])
+        self.assertEqual(checked, 5)
+
+    def test_generated_files(self):
+        manifest = {
+            "pages": {"index.md": {"dest": "index.html", "links": ["/rss.xml", "search/pages.json"], "images": []}}
+        }
+        broken, _ = check_site_links(manifest, {}, ["rss.xml", os.path.join("search", "pages.json")])
+        self.assertEqual(broken, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
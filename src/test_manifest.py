@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from manifest import hash_file, load_manifest, save_manifest
+
+
+class TestManifest(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "manifest.json")
+            save_manifest(path, {"pages": {"index.md": {"hash": "abc"}}})
+            self.assertEqual(load_manifest(path), {"pages": {"index.md": {"hash": "abc"}}})
+
+    def test_missing_or_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "manifest.json")
+            self.assertEqual(load_manifest(path), {})
+            with open(path, "w") as f:
+                f.write("{not json")
+            self.assertEqual(load_manifest(path), {})
+
+    def test_hash_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "a.txt")
+            with open(path, "w") as f:
+                f.write("hello")
+            self.assertEqual(
+                hash_file(path),
+                "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
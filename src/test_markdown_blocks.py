@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from markdown_blocks import *
@@ -33,6 +34,24 @@ This is a paragraph of text. It has some **bold** and *italic* words inside of i
         block = "paragraph"
         self.assertEqual(block_to_block_type(block), block_type_paragraph)
 
+    def test_block_type_matches_classify_block(self):
+        blocks = [
+            "> quote\nnot quote",
+            "* mixed\n- markers",
+            "- dash\n- list",
+            "*italic* paragraph",
+            "1. one\n3. three",
+            "1. one\n2. two\n3.three",
+            "12. twelve",
+            "1.",
+            "```\nunclosed",
+            "```py\nx = 1\n```",
+            "```",
+            "#",
+        ]
+        for block in blocks:
+            self.assertEqual(block_to_block_type(block), classify_block(block)[0], block)
+
     def test_paragraph(self):
         md = """
 This is **bolded** paragraph
@@ -132,5 +151,102 @@ this is paragraph text
             "<div><blockquote>This is a blockquote block</blockquote><p>this is paragraph text</p></div>",
         )
 
+    def test_code_block_with_blank_lines(self):
+        md = """
+Intro text
+
+```
+first line
+
+second line
+```
+
+after
+"""
+        blocks = markdown_to_blocks(md)
+        self.assertEqual(blocks, [
+            "Intro text",
+            "```\nfirst line\n\nsecond line\n```",
+            "after",
+        ])
+        self.assertEqual(block_to_block_type(blocks[1]), block_type_code)
+
+    def test_iter_blocks_from_file(self):
+        fp = io.StringIO("# title\r\n\r\n* a\r\n* b\r\n   \r\npara")
+        self.assertEqual(list(iter_typed_blocks(fp)), [
+            ("# title", block_type_heading),
+            ("* a\n* b", block_type_ulist),
+            ("para", block_type_paragraph),
+        ])
+
+    def test_iter_markdown_html(self):
+        md = """
+# heading
+
+> a quote
+
+```
+code
+
+more code
+```
+
+1. one
+2. two
+"""
+        streamed = "".join(iter_markdown_html(io.StringIO(md)))
+        self.assertEqual(streamed, markdown_to_html_node(md).to_html())
+        self.assertIn("<pre><code>code\n\nmore code\n</code></pre>", streamed)
+
+    def test_block_memo(self):
+        memo = BlockMemo()
+        md = "# title\n\nshared *block*\n\nunique one\n\nshared *block*"
+        streamed = "".join(iter_markdown_html(io.StringIO(md), memo))
+        self.assertEqual(streamed, markdown_to_html_node(md).to_html())
+        self.assertEqual((memo.hits, memo.misses), (1, 3))
+
+    def test_block_memo_eviction(self):
+        memo = BlockMemo(max_bytes=60)
+        memo.render("first block")
+        memo.render("second block")
+        memo.render("first block")
+        memo.render("third block")
+        self.assertEqual(list(memo.entries), ["first block", "third block"])
+        self.assertLessEqual(memo.size, 60)
+
+    def test_register_block_type(self):
+        def detect_table(block, lines):
+            rows = []
+            for line in lines:
+                if not line.startswith("|"):
+                    return None
+                rows.append([cell.strip() for cell in line.strip("|").split("|")])
+            return rows
+
+        def table_to_html_node(rows):
+            return ParentNode("table", [
+                ParentNode("tr", [ParentNode("td", text_to_children(cell)) for cell in row])
+                for row in rows
+            ])
+
+        register_block_type("table", detect_table, table_to_html_node, "|")
+        try:
+            md = "| a | *b* |\n| c | d |\n\n| not a table\nat all"
+            self.assertEqual(block_to_block_type("| a |"), "table")
+            self.assertEqual(
+                markdown_to_html_node(md).to_html(),
+                "<div><table><tr><td>a</td><td><i>b</i></td></tr><tr><td>c</td><td>d</td></tr></table>"
+                "<p>| not a table at all</p></div>",
+            )
+        finally:
+            unregister_block_type("table")
+        self.assertEqual(block_to_block_type("| a |"), block_type_paragraph)
+
+    def test_long_ordered_list(self):
+        md = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+        html = markdown_to_html_node(md).to_html()
+        self.assertTrue(html.endswith("<li>item 10</li><li>item 11</li></ol></div>"))
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from images import ImageIndex, use_image_index
+from pagecache import PageCache
+from tracing import BuildReporter
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PageCache(os.path.join(self.tmp.name, "pages"), "1", max_bytes=1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_open(self):
+        self.assertIsNone(self.cache.open("abcd"))
+        self.cache.put("abcd", "Title", "<div>body</div>")
+        with self.cache.open("abcd") as f:
+            self.assertEqual(f.read(), "Title\n<div>body</div>")
+
+    def test_tee_passes_chunks_through(self):
+        chunks = list(self.cache.tee("abcd", "Title", ["<div>", "body", "</div>"]))
+        self.assertEqual(chunks, ["<div>", "body", "</div>"])
+        with self.cache.open("abcd") as f:
+            self.assertEqual(f.read(), "Title\n<div>body</div>")
+
+    def test_unfinished_tee_leaves_no_entry(self):
+        chunks = self.cache.tee("abcd", "Title", ["<div>", "body", "</div>"])
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(self.cache.open("abcd"))
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, "pages", "1", "ab")), [])
+
+    def test_evict_least_recently_used(self):
+        for i, source_hash in enumerate(["aa01", "aa02", "aa03"]):
+            self.cache.put(source_hash, "t", "x" * 400)
+            os.utime(self.cache.entry_path(source_hash), ns=(i, i))
+        self.cache.open("aa01").close()
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.open("aa02"))
+        cached = self.cache.open("aa01")
+        self.assertIsNotNone(cached)
+        cached.close()
+
+    def test_evict_old_versions(self):
+        self.cache.put("abcd", "t", "body")
+        newer = PageCache(self.cache.dir_path, "2")
+        newer.evict()
+        self.assertIsNone(self.cache.open("abcd"))
+
+
+class TestCachedBuild(unittest.TestCase):
+    def test_template_change_reuses_bodies(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            public = os.path.join(tmp, "public")
+            template = os.path.join(tmp, "template.html")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nSome *text*")
+            with open(template, "w") as f:
+                f.write("{{ Title }}:{{ Content }}")
+            cache = PageCache(os.path.join(tmp, "cache"), "1")
+            generate_pages_recursive(content, template, public, cache=cache)
+
+            with open(template, "w") as f:
+                f.write("<title>{{ Title }}</title>{{ Content }}")
+            reporter = BuildReporter("quiet", tracing=True)
+            generate_pages_recursive(content, template, public, reporter=reporter, cache=cache)
+            with open(os.path.join(public, "index.html")) as f:
+                self.assertEqual(f.read(), "<title>Home</title><div><h1>Home</h1><p>Some <i>text</i></p></div>")
+            self.assertEqual(reporter.traces[0].counts, {"cached": 1})
+
+    def test_image_change_misses_only_its_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            public = os.path.join(tmp, "public")
+            template = os.path.join(tmp, "template.html")
+            os.makedirs(content)
+            with open(os.path.join(content, "a.md"), "w") as f:
+                f.write("# A\n\n![a](/a.png)")
+            with open(os.path.join(content, "b.md"), "w") as f:
+                f.write("# B\n\n![b](/b.png)")
+            with open(os.path.join(content, "c.md"), "w") as f:
+                f.write("# C")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+            cache = PageCache(os.path.join(tmp, "cache"), "1")
+            a = {"width": 10, "height": 10, "variants": []}
+            b = {"width": 20, "height": 20, "variants": []}
+            try:
+                for a_width in [10, 30]:
+                    images = ImageIndex({"/a.png": dict(a, width=a_width), "/b.png": b})
+                    reporter = BuildReporter("quiet", tracing=True)
+                    generate_pages_recursive(content, template, public, reporter=reporter, cache=cache, images=images)
+            finally:
+                use_image_index(None)
+            cached = {os.path.basename(trace.page): trace.counts.get("cached") for trace in reporter.traces}
+            self.assertEqual(cached, {"a.md": None, "b.md": 1, "c.md": 1})
+            with open(os.path.join(public, "a.html")) as f:
+                self.assertIn('width="30"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from pipeline import format_pipeline_stats, run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_every_task_is_written(self):
+        written = {}
+
+        def write(task, rendered):
+            written[task] = rendered
+
+        results, stats = run_pipeline(
+            range(50), lambda task: task * 2, lambda task, item: item + 1, write, readers=3, writers=2, queue_size=4
+        )
+        self.assertEqual(sorted(results), [(i, None) for i in range(50)])
+        self.assertEqual(written, {i: i * 2 + 1 for i in range(50)})
+        self.assertLessEqual(stats["read_queue_max"], 4)
+        self.assertLessEqual(stats["write_queue_max"], 4)
+
+    def test_errors_are_reported_per_stage(self):
+        def read(task):
+            if task == "read":
+                raise OSError("cannot read")
+            return task
+
+        def render(task, item):
+            if task == "render":
+                raise ValueError("cannot render")
+            return item
+
+        def write(task, rendered):
+            if task == "write":
+                raise OSError("cannot write")
+
+        results, _ = run_pipeline(["ok", "read", "render", "write"], read, render, write, readers=2, writers=2)
+        self.assertEqual(
+            dict(results),
+            {
+                "ok": None,
+                "read": "OSError: cannot read",
+                "render": "ValueError: cannot render",
+                "write": "OSError: cannot write",
+            },
+        )
+
+    def test_stats_report(self):
+        _, stats = run_pipeline([], lambda task: task, lambda task, item: item, lambda task, rendered: None)
+        self.assertEqual(stats["read_queue_max"], 0)
+        self.assertIn("render: 1 thread", format_pipeline_stats(stats))
+
+    def test_needs_a_thread_per_stage(self):
+        for readers, writers in [(0, 1), (1, 0)]:
+            with self.assertRaises(ValueError):
+                run_pipeline(
+                    [1], lambda task: task, lambda task, item: item, lambda task, rendered: None, readers, writers
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import unittest
+
+from publish import live_dir_path, prepare_staging, publish, remove_public
+from testsupport import SiteFixture
+
+
+class TestStagedPublish(SiteFixture, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.write(os.path.join(self.public, "index.html"), "old index")
+        self.write(os.path.join(self.public, "blog", "index.html"), "old blog")
+
+    def test_staging_is_hardlinked_from_live(self):
+        staging = prepare_staging(self.public)
+        self.assertNotEqual(os.path.normpath(staging), os.path.normpath(self.public))
+        self.assertTrue(
+            os.path.samefile(os.path.join(staging, "blog", "index.html"), os.path.join(self.public, "blog", "index.html"))
+        )
+
+    def test_publish_swaps_in_staging(self):
+        staging = prepare_staging(self.public)
+        os.replace(os.path.join(staging, "index.html"), os.path.join(staging, "moved.html"))
+        self.write(os.path.join(staging, "index.html"), "new index")
+        self.assertEqual(self.read("index.html"), "old index")
+        publish(staging, self.public)
+        self.assertTrue(os.path.islink(self.public))
+        self.assertEqual(self.read("index.html"), "new index")
+        self.assertEqual(self.read("blog", "index.html"), "old blog")
+
+    def test_generations_alternate(self):
+        first = prepare_staging(self.public)
+        publish(first, self.public)
+        second = prepare_staging(self.public)
+        self.assertNotEqual(first, second)
+        self.assertEqual(os.path.normpath(live_dir_path(self.public)), os.path.normpath(first))
+        publish(second, self.public)
+        self.assertEqual(os.path.normpath(live_dir_path(self.public)), os.path.normpath(second))
+        # The next staging directory is the one that just went out of service.
+        self.assertEqual(prepare_staging(self.public), first)
+
+    def test_remove_public(self):
+        publish(prepare_staging(self.public), self.public)
+        remove_public(self.public)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import unittest
+
+from gencontent import generate_pages_incremental
+from manifest import load_manifest, save_manifest
+from search import page_terms, remove_search_index, shard_name, update_search_index
+from testsupport import SiteFixture
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_terms(self):
+        markdown = """# Rivendell
+
+The **house** of [Elrond](/elrond) in Rivendell.
+
+* Elrond's house
+
+```
+code_is_skipped
+```
+"""
+        self.assertEqual(
+            page_terms(markdown.split("\n"), "Rivendell"),
+            {"rivendell": 12, "the": 1, "house": 2, "of": 1, "elrond": 2, "in": 1},
+        )
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("rivendell"), "r")
+        self.assertEqual(shard_name("éa"), "_e9")
+
+
+class TestSearchIndex(SiteFixture, unittest.TestCase):
+    template_text = "{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("manifest.json")
+        self.index = self.path("search.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to rivendell")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nWelcome to mordor")
+
+    def read_shard(self, name):
+        return json.loads(self.read("search", name + ".json"))
+
+    def build(self):
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest)
+        return update_search_index(self.content, self.public, load_manifest(self.manifest), self.index)
+
+    def test_index(self):
+        stats = self.build()
+        self.assertEqual(stats["indexed"], 2)
+        self.assertEqual(self.read_shard("pages"), [["/blog/", "Blog"], ["/", "Home"]])
+        self.assertEqual(self.read_shard("w"), {"welcome": [[0, 1], [1, 1]]})
+
+    def test_incremental_update(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to moria")
+        stats = self.build()
+        self.assertEqual((stats["indexed"], stats["unchanged"]), (1, 1))
+        # Only the "m" shard is rewritten and "r" removed; "w" and the titles are untouched.
+        self.assertEqual((stats["written"], stats["removed"]), (1, 1))
+        self.assertEqual(self.read_shard("m"), {"moria": [[1, 1]], "mordor": [[0, 1]]})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "r.json")))
+        # A shard file that went missing is restored on its own.
+        os.remove(os.path.join(self.public, "search", "w.json"))
+        stats = self.build()
+        self.assertEqual((stats["indexed"], stats["written"]), (0, 1))
+        self.assertEqual(self.read_shard("w"), {"welcome": [[0, 1], [1, 1]]})
+        remove_search_index(self.public, self.index)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search")))
+
+    def test_old_version_is_rebuilt(self):
+        self.build()
+        index = load_manifest(self.index)
+        del index["version"]
+        index["shards"]["zz"] = "stale"
+        save_manifest(self.index, index)
+        self.write(os.path.join(self.public, "search", "zz.json"), "{}")
+        stats = self.build()
+        self.assertEqual((stats["indexed"], stats["removed"]), (2, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "search", "zz.json")))
+
+
+if __name__ == "__main__":
+    unittest.main()
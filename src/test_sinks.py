@@ -0,0 +1,112 @@
+import os
+import tarfile
+import unittest
+import zipfile
+
+from copystatic import copy_files_recursive, sync_files_recursive
+from gencontent import generate_pages_incremental, generate_pages_recursive
+from sinks import FileSink, MemorySink, TarSink, open_archive_sink
+from testsupport import SiteFixture
+
+
+class TestSinks(SiteFixture, unittest.TestCase):
+    template_text = "<title>{{ Title }}</title>{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("manifest.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.txt"), "a")
+
+    def expected(self):
+        return {
+            "index.html": b"<title>Home</title><div><h1>Home</h1><p>Hello</p></div>",
+            "blog/post.html": b"<title>Post</title><div><h1>Post</h1></div>",
+            "index.css": b"body {}",
+            "images/a.txt": b"a",
+        }
+
+    def build(self, sink):
+        copy_files_recursive(self.static, self.public, sink=sink)
+        generate_pages_recursive(self.content, self.template, self.public, jobs=4, sink=sink)
+
+    def test_memory_sink(self):
+        sink = MemorySink(self.public)
+        self.build(sink)
+        self.assertEqual(sink.files, self.expected())
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_memory_sink_pipeline(self):
+        sink = MemorySink(self.public)
+        generate_pages_recursive(self.content, self.template, self.public, pipeline={"writers": 2}, sink=sink)
+        self.assertEqual(sorted(sink.files), ["blog/post.html", "index.html"])
+
+    def test_memory_sink_incremental(self):
+        sink = MemorySink(self.public)
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest, sink=sink)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest, sink=sink)
+        self.assertEqual(sorted(sink.files), ["index.html"])
+
+    def test_memory_sink_sync_removes(self):
+        sink = MemorySink(self.public)
+        static_manifest = self.path("static.json")
+        sync_files_recursive(self.static, self.public, static_manifest, sink=sink)
+        os.remove(os.path.join(self.static, "index.css"))
+        stats = sync_files_recursive(self.static, self.public, static_manifest, sink=sink)
+        self.assertEqual(stats, {"copied": 0, "unchanged": 1, "removed": 1})
+        self.assertEqual(sorted(sink.files), ["images/a.txt"])
+
+    def test_file_sink(self):
+        self.build(FileSink())
+        for name, data in self.expected().items():
+            with open(os.path.join(self.public, name), "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_file_sink_bare_name(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            FileSink().copy_file(os.path.join(self.static, "index.css"), "copy.css")
+        finally:
+            os.chdir(cwd)
+        with open(self.path("copy.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_tar_sink(self):
+        path = self.path("site.tar.gz")
+        with open_archive_sink(path, self.public) as sink:
+            self.build(sink)
+        self.assertFalse(os.path.exists(sink.tmp_path))
+        with tarfile.open(path) as archive:
+            files = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+            self.assertEqual(archive.getmember("index.css").uname, "")
+        self.assertEqual(files, self.expected())
+
+    def test_zip_sink(self):
+        path = self.path("site.zip")
+        with open_archive_sink(path, self.public) as sink:
+            self.build(sink)
+        with zipfile.ZipFile(path) as archive:
+            files = {name: archive.read(name) for name in archive.namelist()}
+        self.assertEqual(files, self.expected())
+
+    def test_failed_build_leaves_no_archive(self):
+        path = self.path("site.tar")
+        self.write(os.path.join(self.content, "broken.md"), "no title")
+        sink = TarSink(path, self.public)
+        with self.assertRaises(Exception):
+            with sink:
+                self.build(sink)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(sink.tmp_path))
+
+    def test_unknown_archive_type(self):
+        with self.assertRaises(ValueError):
+            open_archive_sink(self.path("site.rar"))
+
+
+if __name__ == "__main__":
+    unittest.main()
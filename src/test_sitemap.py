@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from gencontent import generate_pages_incremental
+from manifest import load_manifest
+from sitemap import write_sitemap_and_feeds
+from testsupport import SiteFixture
+
+
+class TestSitemapAndFeeds(SiteFixture, unittest.TestCase):
+    template_text = "{{ Content }}"
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.path("manifest.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home & Away")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# First post")
+        os.utime(os.path.join(self.content, "index.md"), ns=(0, 0))
+        os.utime(os.path.join(self.content, "blog", "post.md"), ns=(86400 * 10**9, 86400 * 10**9))
+
+    def build(self):
+        generate_pages_incremental(self.content, self.template, self.public, self.manifest)
+        return write_sitemap_and_feeds(self.public, load_manifest(self.manifest), "https://example.com/", 1)
+
+    def test_sitemap(self):
+        self.assertEqual(self.build(), {"written": 3, "unchanged": 0})
+        self.assertIn(
+            "<url><loc>https://example.com/</loc><lastmod>1970-01-01T00:00:00+00:00</lastmod></url>\n"
+            "<url><loc>https://example.com/blog/post.html</loc><lastmod>1970-01-02T00:00:00+00:00</lastmod></url>",
+            self.read("sitemap.xml"),
+        )
+
+    def test_feeds_hold_newest_pages(self):
+        self.build()
+        atom = self.read("atom.xml")
+        self.assertIn("<title>Home &amp; Away</title>", atom)
+        self.assertIn("<entry><title>First post</title>", atom)
+        self.assertNotIn("<entry><title>Home", atom)
+        self.assertIn("<pubDate>Fri, 02 Jan 1970 00:00:00 +0000</pubDate>", self.read("rss.xml"))
+
+    def test_unchanged_files_are_not_rewritten(self):
+        self.build()
+        self.assertEqual(self.build(), {"written": 0, "unchanged": 3})
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Renamed post")
+        self.assertEqual(self.build(), {"written": 3, "unchanged": 0})
+        self.assertIn("Renamed post", self.read("atom.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
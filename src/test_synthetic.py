@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import compare
+from gencontent import extract_title
+from markdown_blocks import markdown_to_html_node
+from synthetic import generate_corpus
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def read_corpus(self, dir_path, seed):
+        paths = generate_corpus(dir_path, pages=12, paragraphs=6, depth=2, fanout=2, seed=seed)
+        texts = []
+        for path in paths:
+            with open(path) as f:
+                texts.append((os.path.relpath(path, dir_path), f.read()))
+        return texts
+
+    def test_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = self.read_corpus(os.path.join(tmp, "a"), 1)
+            second = self.read_corpus(os.path.join(tmp, "b"), 1)
+            other = self.read_corpus(os.path.join(tmp, "c"), 2)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(first), 12)
+        self.assertEqual(first[0][0], os.path.join("section0", "section0", "page0.md"))
+
+    def test_pages_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for rel_path, markdown in self.read_corpus(tmp, 0):
+                self.assertTrue(extract_title(markdown).startswith("Page "))
+                self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div><h1>"))
+
+
+class TestCompare(unittest.TestCase):
+    def test_flags_regressions(self):
+        baseline = {"stages": {"read": 1.0, "to_html": 1.0}}
+        results = {"stages": {"read": 1.05, "to_html": 1.5, "new_stage": 2.0}}
+        self.assertEqual(compare(results, baseline, 0.10), ["to_html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from template import Template, clear_template_cache, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>text</p>"}),
+            "<title>Hi</title><body><p>text</p></body>",
+        )
+
+    def test_segments(self):
+        template = Template("a{{Title}}b{{ Date }}c")
+        self.assertEqual(template.literals, ["a", "b", "c"])
+        self.assertEqual(template.names, ["Title", "Date"])
+
+    def test_missing_value_is_empty(self):
+        template = Template("{{ Title }}|{{ Description }}|{{ Title }}")
+        self.assertEqual(template.render({"Title": "x"}), "x||x")
+
+    def test_values_are_not_rescanned(self):
+        template = Template("{{ Title }}{{ Content }}")
+        self.assertEqual(
+            template.render({"Title": "{{ Content }}", "Content": "body"}),
+            "{{ Content }}body",
+        )
+
+    def test_streamed_values(self):
+        template = Template("<div>{{ Content }}</div>")
+        chunks = list(template.iter_chunks({"Content": iter(["<p>", "a", "</p>"])}))
+        self.assertEqual("".join(chunks), "<div><p>a</p></div>")
+
+    def test_repeated_streamed_value(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        self.assertEqual(template.render({"Content": iter(["a", "b"])}), "ab|ab")
+
+    def test_load_template_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            clear_template_cache()
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            clear_template_cache()
+            self.assertIsNot(load_template(path), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
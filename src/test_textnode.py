@@ -24,6 +24,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", "bold", "some url")
         self.assertNotEqual(node, node2)
 
+    def test_no_dict(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_repr(self):
         node = TextNode("This is a text node", "text", "https://www.boot.dev")
         self.assertEqual("TextNode(This is a text node, text, https://www.boot.dev)", repr(node))
@@ -283,5 +287,76 @@ class TestSplitNodesDelimiter(unittest.TestCase):
                         ]
         )
 
+class TestTextToTextNodes(unittest.TestCase):
+    def test_escapes(self):
+        node_list = text_to_textnodes(r"not \*italic\* and **bold \*\*** here")
+        self.assertEqual(node_list, [
+                TextNode("not *italic* and ", text_type_text),
+                TextNode("bold **", text_type_bold),
+                TextNode(" here", text_type_text),
+            ]
+        )
+
+    def test_code_is_literal(self):
+        node_list = text_to_textnodes("use `**kwargs` and `[a](b)`")
+        self.assertEqual(node_list, [
+                TextNode("use ", text_type_text),
+                TextNode("**kwargs", text_type_code),
+                TextNode(" and ", text_type_text),
+                TextNode("[a](b)", text_type_code),
+            ]
+        )
+
+    def test_unmatched_brackets_are_text(self):
+        node_list = text_to_textnodes("a [b and ![c] then [d](e) !")
+        self.assertEqual(node_list, [
+                TextNode("a [b and ![c] then ", text_type_text),
+                TextNode("d", text_type_link, "e"),
+                TextNode(" !", text_type_text),
+            ]
+        )
+
+    def test_image_at_start(self):
+        node_list = text_to_textnodes("![alt](/a.png)[link](/b)")
+        self.assertEqual(node_list, [
+                TextNode("alt", text_type_image, "/a.png"),
+                TextNode("link", text_type_link, "/b"),
+            ]
+        )
+
+    def test_unclosed(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("this **never closes")
+        with self.assertRaises(Exception):
+            text_to_textnodes("this `never closes")
+
+    def test_many_links(self):
+        text = " ".join(f"[l{i}](/p{i}) *e{i}*" for i in range(500))
+        node_list = text_to_textnodes(text)
+        self.assertEqual(len(node_list), 1999)
+        self.assertEqual(node_list[-3], TextNode("l499", text_type_link, "/p499"))
+        self.assertEqual(node_list[-1], TextNode("e499", text_type_italic))
+
+    def test_emphasis_with_link(self):
+        node_list = text_to_textnodes("**see [docs](/x)** and *`x` or ![y](/y.png)*")
+        self.assertEqual(node_list, [
+                TextNode("see docs", text_type_bold, children=[
+                    TextNode("see ", text_type_text),
+                    TextNode("docs", text_type_link, "/x"),
+                ]),
+                TextNode(" and ", text_type_text),
+                TextNode("x or y", text_type_italic, children=[
+                    TextNode("x", text_type_code),
+                    TextNode(" or ", text_type_text),
+                    TextNode("y", text_type_image, "/y.png"),
+                ]),
+            ]
+        )
+        html = "".join(text_node_to_html_node(node).to_html() for node in node_list)
+        self.assertEqual(
+            html, '<b>see <a href="/x">docs</a></b> and <i><code>x</code> or <img src="/y.png" alt="y"></img></i>'
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from tracing import BuildReporter, PageTrace, slowest_pages_table, write_chrome_trace
+
+
+def make_trace(page, durations):
+    trace = PageTrace(page)
+    now = trace.start_ns
+    for stage, duration_ns in durations:
+        trace.stages.append((stage, now, duration_ns))
+        now += duration_ns
+    trace.last_ns = now
+    trace.counts = {"nodes": 3}
+    return trace
+
+
+class TestTracing(unittest.TestCase):
+    def test_lap(self):
+        trace = PageTrace("a.md")
+        trace.lap("read")
+        trace.lap("parse")
+        self.assertEqual([stage for stage, _, _ in trace.stages], ["read", "parse"])
+        self.assertEqual(sum(duration for _, _, duration in trace.stages), trace.total_ns())
+
+    def test_chrome_trace(self):
+        traces = [make_trace("a.md", [("read", 1000), ("parse", 3000)])]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            write_chrome_trace(traces, path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual([event["name"] for event in events], ["a.md", "read", "parse"])
+        self.assertEqual([event["dur"] for event in events], [4.0, 1.0, 3.0])
+        self.assertEqual(events[2]["ts"], 1.0)
+        self.assertEqual(events[0]["args"], {"nodes": 3})
+
+    def test_slowest_pages_table(self):
+        traces = [
+            make_trace("fast.md", [("read", 1000)]),
+            make_trace("slow.md", [("read", 5_000_000), ("parse", 1_000_000)]),
+        ]
+        lines = slowest_pages_table(traces, 1).split("\n")
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith("slow.md"))
+        self.assertIn("6.00", lines[1])
+
+    def test_reporter_modes(self):
+        for mode, expected in [
+            ("quiet", ""),
+            ("progress", " * pages: 1 rendered, 0 failed\n"),
+            ("verbose", " * a.md t.html -> a.html\n"),
+        ]:
+            stream = io.StringIO()
+            reporter = BuildReporter(mode, stream=stream)
+            reporter.start(1)
+            reporter.page_done("a.md", "t.html", "a.html")
+            reporter.finish()
+            self.assertEqual(stream.getvalue(), expected)
+
+    def test_traced_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nSome **text**")
+            reporter = BuildReporter("quiet", tracing=True)
+            generate_pages_recursive(content, template, os.path.join(tmp, "public"), reporter=reporter)
+            with open(os.path.join(tmp, "public", "index.html")) as f:
+                self.assertEqual(f.read(), "Home<div><h1>Home</h1><p>Some <b>text</b></p></div>")
+        self.assertEqual(len(reporter.traces), 1)
+        trace = reporter.traces[0]
+        self.assertEqual(
+            [stage for stage, _, _ in trace.stages], ["read", "blocks", "memo", "parse", "serialize", "write"]
+        )
+        self.assertEqual(trace.counts["blocks"], 2)
+        # div; h1 and its text; p, its text and the b leaf.
+        self.assertEqual(trace.counts["nodes"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
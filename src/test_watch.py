@@ -0,0 +1,118 @@
+import os
+import threading
+import unittest
+
+from images import ImageIndex
+from manifest import load_manifest
+from testsupport import SiteFixture
+from watch import ReloadNotifier, SiteWatcher
+
+
+class TestSiteWatcher(SiteFixture, unittest.TestCase):
+    template_text = "{{ Title }}"
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(self.static)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public, self.path("manifest.json"))
+
+    def test_no_changes(self):
+        self.assertFalse(self.watcher.poll())
+
+    def test_page_change_renders_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Changed title")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(self.read("index.html"), "Changed title")
+
+    def test_new_page_in_new_directory(self):
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.watcher.poll()
+        self.assertEqual(self.read("blog", "index.html"), "Blog")
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_draft_is_not_published(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home page")
+        self.write(os.path.join(self.content, "draft.md"), "---\ndraft: true\n---\n# Draft")
+        self.watcher.poll()
+        self.assertEqual(self.read("index.html"), "Home page")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "draft.html")))
+        self.write(os.path.join(self.content, "index.md"), "---\ndraft: true\n---\n# Home")
+        os.utime(os.path.join(self.content, "index.md"), ns=(1, 1))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_drafts_option_publishes_drafts(self):
+        self.watcher.drafts = True
+        self.write(os.path.join(self.content, "draft.md"), "---\ndraft: true\n---\n# Draft")
+        self.watcher.poll()
+        self.assertEqual(self.read("draft.html"), "Draft")
+
+    def test_static_change_copies_file(self):
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher.poll()
+        self.assertEqual(self.read("index.css"), "body {}")
+
+    def test_template_change_renders_all(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.watcher.poll()
+        self.assertEqual(self.read("index.html"), "<h1>Home</h1>")
+
+    def test_refresh_gets_changed_outputs(self):
+        builds = []
+        refreshes = []
+        self.watcher.rebuild = lambda: builds.append(1) or ({}, None)
+        self.watcher.refresh = lambda outputs, pages: refreshes.append((sorted(outputs), pages))
+        self.write(os.path.join(self.content, "index.md"), "# Changed title")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(builds, [])
+        self.assertEqual(refreshes, [(["index.css", "index.html"], True)])
+        self.assertEqual(self.read("index.html"), "Changed title")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.watcher.poll()
+        self.assertEqual(refreshes[-1], (["index.css"], False))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_rebuild_for_template_and_images(self):
+        builds = []
+        self.watcher.rebuild = lambda: builds.append(1) or ({}, ImageIndex())
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.watcher.poll()
+        self.assertEqual(builds, [1])
+        self.assertFalse(os.path.exists(self.public))
+        # Pages embed image attributes, so a changed image rebuilds too, but
+        # only while there is an image index.
+        self.write(os.path.join(self.static, "a.png"), "not really a png")
+        self.watcher.poll()
+        self.assertEqual(builds, [1, 1])
+        self.watcher.images = None
+        self.write(os.path.join(self.static, "b.png"), "not really a png")
+        self.watcher.poll()
+        self.assertEqual(builds, [1, 1])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "b.png")))
+
+    def test_page_updates_manifest(self):
+        self.write(os.path.join(self.content, "index.md"), "# Changed title")
+        self.watcher.poll()
+        pages = load_manifest(self.watcher.manifest_path)["pages"]
+        self.assertEqual(pages["index.md"]["title"], "Changed title")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.watcher.poll()
+        self.assertEqual(load_manifest(self.watcher.manifest_path)["pages"], {})
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+class TestReloadNotifier(unittest.TestCase):
+    def test_wait(self):
+        notifier = ReloadNotifier()
+        self.assertEqual(notifier.wait(0, 0.01), 0)
+        threading.Timer(0.01, notifier.notify).start()
+        self.assertEqual(notifier.wait(0, 5), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
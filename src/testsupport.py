@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+
+class SiteFixture:
+    # Mixed into unittest.TestCase classes that work on a small site in a
+    # temporary directory. content, static, public and template name paths
+    # inside it; nothing is created until a test writes there, except the
+    # template when template_text is set.
+    template_text = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = self.path("content")
+        self.static = self.path("static")
+        self.public = self.path("public")
+        self.template = self.path("template.html")
+        if self.template_text is not None:
+            self.write(self.template, self.template_text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.tmp.name, *parts)
+
+    def write(self, path, text):
+        # Missing parent directories are created.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        # A file in the output directory.
+        with open(os.path.join(self.public, *parts)) as f:
+            return f.read()
@@ -1,4 +1,4 @@
-from htmlnode import LeafNode
+from htmlnode import LeafNode, ParentNode
 import re
 
 text_type_text = "text"
@@ -8,26 +8,41 @@ text_type_code = "code"
 text_type_link = "link"
 text_type_image = "image"
 
+# Optional hook returning extra <img> attributes for a src, such as the
+# dimensions images.use_image_index installs for a build.
+image_resolver = None
+
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    # children holds the links, images and code inside a bold or italic span;
+    # text is then the plain text of those children.
+    def __init__(self, text, text_type, url=None, children=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        self.children = children
 
     def __eq__(self, other):
         if (
         self.text == other.text
         and self.text_type == other.text_type
         and self.url == other.url
+        and self.children == other.children
         ):
             return True
         else:
             return False
     def __repr__(self):
+        if self.children is not None:
+            return f"TextNode({self.text}, {self.text_type}, {self.url}, children: {self.children})"
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
     
 def text_node_to_html_node(text_node):
+    if text_node.children is not None:
+        tag = "b" if text_node.text_type == text_type_bold else "i"
+        return ParentNode(tag, [text_node_to_html_node(child) for child in text_node.children])
     if text_node.text_type == text_type_text:
         return LeafNode(None, text_node.text)
     if text_node.text_type == text_type_bold:
@@ -39,7 +54,10 @@ def text_node_to_html_node(text_node):
     if text_node.text_type == text_type_link:
         return LeafNode("a", text_node.text, {"href": text_node.url})
     if text_node.text_type == text_type_image:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        props = {"src": text_node.url, "alt": text_node.text}
+        if image_resolver is not None:
+            props.update(image_resolver(text_node.url))
+        return LeafNode("img", "", props)
     raise ValueError(f"Invalid text type: {text_node.text_type}")
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
@@ -144,10 +162,153 @@ def split_nodes_link(old_nodes):
         return_list.extend(new_list)
     return return_list
 
-def text_to_textnodes(text):
-    node = TextNode(text, text_type_text)
-    bold = split_nodes_delimiter([node], "**", text_type_bold)
-    italic = split_nodes_delimiter(bold, "*", text_type_italic)
-    code = split_nodes_delimiter(italic, "`", text_type_code)
-    image = split_nodes_image(code)
-    return split_nodes_link(image)
+inline_special = re.compile(r"[\\`*!\[]")
+# Inside an emphasis span: everything but further emphasis.
+inline_nested = re.compile(r"[\\`!\[]")
+inline_escape = re.compile(r"\\([\\`*_{}\[\]()#+\-.!>])")
+escapable = "\\`*_{}[]()#+-.!>"
+
+
+def text_to_textnodes(text, special=inline_special):
+    # One left-to-right scan: plain text is copied in slices between special
+    # characters, and every closing delimiter is searched for from the current
+    # position only, so the work is linear in the length of the text.
+    nodes = []
+    buffer = []
+    link_state = {}
+    pos = 0
+    while True:
+        match = special.search(text, pos)
+        if match is None:
+            buffer.append(text[pos:])
+            break
+        i = match.start()
+        buffer.append(text[pos:i])
+        char = text[i]
+
+        if char == "\\":
+            if i + 1 < len(text) and text[i + 1] in escapable:
+                buffer.append(text[i + 1])
+                pos = i + 2
+            else:
+                buffer.append(char)
+                pos = i + 1
+            continue
+
+        if char == "`":
+            end = text.find("`", i + 1)
+            if end == -1:
+                raise Exception("Invalid Markdown, formatted section not closed")
+            flush_text(nodes, buffer)
+            if end > i + 1:
+                nodes.append(TextNode(text[i + 1 : end], text_type_code))
+            pos = end + 1
+            continue
+
+        if char == "*":
+            delimiter = "**" if text.startswith("**", i) else "*"
+            start = i + len(delimiter)
+            end = find_closing(text, delimiter, start)
+            if end == -1:
+                raise Exception("Invalid Markdown, formatted section not closed")
+            flush_text(nodes, buffer)
+            if end > start:
+                text_type = text_type_bold if delimiter == "**" else text_type_italic
+                nodes.append(emphasis_node(text[start:end], text_type))
+            pos = end + len(delimiter)
+            continue
+
+        if char == "!":
+            link = None
+            if text.startswith("[", i + 1):
+                link = match_link(text, i + 1, link_state)
+            if link is None:
+                buffer.append(char)
+                pos = i + 1
+                continue
+            alt_text, url, pos = link
+            flush_text(nodes, buffer)
+            nodes.append(TextNode(alt_text, text_type_image, url))
+            continue
+
+        link = match_link(text, i, link_state)
+        if link is None:
+            buffer.append(char)
+            pos = i + 1
+            continue
+        link_text, url, pos = link
+        flush_text(nodes, buffer)
+        nodes.append(TextNode(link_text, text_type_link, url))
+
+    flush_text(nodes, buffer)
+    return nodes
+
+
+def emphasis_node(text, text_type):
+    # Links, images and code inside the span become its children, so
+    # "**see [docs](/x)**" renders as <b>see <a href="/x">docs</a></b>.
+    if inline_nested.search(text) is None:
+        return TextNode(text, text_type)
+    children = text_to_textnodes(text, inline_nested)
+    if len(children) == 1 and children[0].text_type == text_type_text:
+        return TextNode(children[0].text, text_type)
+    return TextNode("".join(child.text for child in children), text_type, children=children)
+
+
+def iter_text_nodes(nodes):
+    # nodes and, in order, the children of any emphasis span among them.
+    for node in nodes:
+        yield node
+        if node.children is not None:
+            yield from iter_text_nodes(node.children)
+
+
+def flush_text(nodes, buffer):
+    text = "".join(buffer)
+    buffer.clear()
+    if text != "":
+        nodes.append(TextNode(text, text_type_text))
+
+
+def unescape(text):
+    if "\\" not in text:
+        return text
+    return inline_escape.sub(r"\1", text)
+
+
+def find_closing(text, delimiter, start):
+    end = text.find(delimiter, start)
+    while end != -1 and is_escaped(text, end, start):
+        end = text.find(delimiter, end + 1)
+    return end
+
+
+def is_escaped(text, pos, start):
+    count = 0
+    while pos - count - 1 >= start and text[pos - count - 1] == "\\":
+        count += 1
+    return count % 2 == 1
+
+
+def match_link(text, start, link_state):
+    # link_state remembers the next "](" and ")" found so far, so a paragraph
+    # full of stray "[" does not rescan the rest of the text for each one.
+    close = next_index(text, "](", start + 1, link_state)
+    if close == -1 or text.find("[", start + 1, close) != -1:
+        return None
+    end = next_index(text, ")", close + 2, link_state)
+    if end == -1:
+        return None
+    label = text[start + 1 : close]
+    url = text[close + 2 : end]
+    if "\n" in label or "\n" in url:
+        return None
+    return label, url, end + 1
+
+
+def next_index(text, needle, start, link_state):
+    found = link_state.get(needle)
+    if found is None or (found != -1 and found < start):
+        found = text.find(needle, start)
+        link_state[needle] = found
+    return found
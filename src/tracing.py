@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+import time
+
+from htmlnode import ParentNode
+
+report_modes = ["quiet", "progress", "verbose"]
+
+
+class PageTrace:
+    def __init__(self, page):
+        self.page = page
+        self.pid = os.getpid()
+        self.start_ns = time.perf_counter_ns()
+        self.last_ns = self.start_ns
+        self.stages = []
+        self.counts = {}
+
+    def lap(self, stage):
+        now = time.perf_counter_ns()
+        self.stages.append((stage, self.last_ns, now - self.last_ns))
+        self.last_ns = now
+
+    def span(self, stage, start_ns):
+        # A stage timed on its own, for pages whose stages run on different
+        # threads with queue waits in between (--pipeline). The page then
+        # runs from its first stage's start to its last stage's end.
+        now = time.perf_counter_ns()
+        if len(self.stages) == 0:
+            self.start_ns = start_ns
+        self.stages.append((stage, start_ns, now - start_ns))
+        self.last_ns = max(self.last_ns, now)
+
+    def total_ns(self):
+        return self.last_ns - self.start_ns
+
+    def __repr__(self):
+        return f"PageTrace({self.page}, {self.total_ns()} ns, {self.stages})"
+
+
+class BuildReporter:
+    def __init__(self, mode="progress", tracing=False, stream=None):
+        if mode not in report_modes:
+            raise ValueError(f"Invalid report mode: {mode}")
+        self.mode = mode
+        self.tracing = tracing
+        self.stream = stream if stream is not None else sys.stdout
+        self.traces = []
+        self.stats = {}
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.last_draw = 0
+
+    def start(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+
+    def page_done(self, from_path, template_path, dest_path, trace=None):
+        self.done += 1
+        if trace is not None:
+            self.traces.append(trace)
+        if self.mode == "verbose":
+            print(f" * {from_path} {template_path} -> {dest_path}", file=self.stream)
+        elif self.mode == "progress":
+            self.draw(False)
+
+    def add_stats(self, stats):
+        for name, value in stats.items():
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def page_failed(self, from_path, error):
+        self.done += 1
+        self.failed += 1
+        if self.mode == "progress" and self.stream.isatty():
+            self.stream.write("\r\033[K")
+        print(f" ! {from_path}: {error}", file=sys.stderr)
+
+    def status(self, message):
+        if self.mode != "quiet":
+            print(message, file=self.stream)
+
+    def note(self, message):
+        if self.mode == "verbose":
+            print(f" * {message}", file=self.stream)
+
+    def finish(self):
+        if self.mode == "progress":
+            self.draw(True)
+        if self.mode != "quiet" and self.total > 0 and len(self.stats) > 0:
+            summary = ", ".join(f"{value} {name}" for name, value in self.stats.items())
+            print(f" * stats: {summary}", file=self.stream)
+
+    def draw(self, final):
+        # Redraw at most ten times a second; when not on a terminal only the
+        # final summary line is written.
+        now = time.monotonic()
+        if self.stream.isatty() and (final or now - self.last_draw >= 0.1):
+            self.last_draw = now
+            self.stream.write(f"\r * pages: {self.done}/{self.total}")
+            if final:
+                self.stream.write(f", {self.failed} failed\n")
+            self.stream.flush()
+        elif final:
+            print(f" * pages: {self.done - self.failed} rendered, {self.failed} failed", file=self.stream)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while len(stack) > 0:
+        item = stack.pop()
+        count += 1
+        if isinstance(item, ParentNode):
+            stack.extend(item.children)
+    return count
+
+
+def write_chrome_trace(traces, path):
+    # Trace Event Format, "complete" events: load in chrome://tracing or Perfetto.
+    if len(traces) == 0:
+        origin_ns = 0
+    else:
+        origin_ns = min(trace.start_ns for trace in traces)
+    events = []
+    for trace in traces:
+        events.append({
+            "name": trace.page,
+            "cat": "page",
+            "ph": "X",
+            "ts": (trace.start_ns - origin_ns) / 1000,
+            "dur": trace.total_ns() / 1000,
+            "pid": trace.pid,
+            "tid": 0,
+            "args": trace.counts,
+        })
+        for stage, start_ns, duration_ns in trace.stages:
+            events.append({
+                "name": stage,
+                "cat": "stage",
+                "ph": "X",
+                "ts": (start_ns - origin_ns) / 1000,
+                "dur": duration_ns / 1000,
+                "pid": trace.pid,
+                "tid": 0,
+                "args": {"page": trace.page},
+            })
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def slowest_pages_table(traces, count=10):
+    slowest = sorted(traces, key=lambda trace: trace.total_ns(), reverse=True)[:count]
+    stage_names = []
+    for trace in slowest:
+        for stage, _, _ in trace.stages:
+            if stage not in stage_names:
+                stage_names.append(stage)
+    lines = [
+        f"{'total ms':>9} " + " ".join(f"{stage:>9}" for stage in stage_names) + f" {'nodes':>7}  page"
+    ]
+    for trace in slowest:
+        durations = {stage: duration_ns for stage, _, duration_ns in trace.stages}
+        cells = " ".join(f"{durations.get(stage, 0) / 1e6:>9.2f}" for stage in stage_names)
+        lines.append(f"{trace.total_ns() / 1e6:>9.2f} {cells} {trace.counts.get('nodes', 0):>7}  {trace.page}")
+    return "\n".join(lines)
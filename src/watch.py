@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from copystatic import copy_file, remove_empty_dirs
+from gencontent import generate_pages_incremental, page_dest_path, update_page
+from images import image_extensions
+from template import clear_template_cache, template_filename
+
+livereload_path = "/__livereload"
+livereload_script = (
+    '<script>new EventSource("' + livereload_path + '").onmessage = () => location.reload();</script>'
+)
+
+
+class ReloadNotifier:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    notifier = None
+
+    def do_GET(self):
+        if self.path == livereload_path:
+            self.send_event_stream()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?")[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.send_html(path)
+            return
+        super().do_GET()
+
+    def send_html(self, path):
+        # The reload hook is only added to responses, never to ./public.
+        with open(path, "rb") as f:
+            body = f.read()
+        script = livereload_script.encode()
+        if b"</body>" in body:
+            body = body.replace(b"</body>", script + b"</body>", 1)
+        else:
+            body += script
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_event_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.notifier.version
+        try:
+            while True:
+                new_version = self.notifier.wait(version, 15)
+                if new_version == version:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = new_version
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SiteWatcher:
+    # Applies each change file by file: a page is rendered with the warm
+    # page cache and image index, a static file is copied. rebuild, when
+    # given, is a function running an incremental build of the whole site
+    # and returning its stats and image index; it is only used when a change
+    # reaches every page (a template, or an image whose attributes pages
+    # embed). refresh, when given, is called with the changed or removed
+    # outputs (relative to dir_path_public) and whether pages were among
+    # them, to bring the sitemap, search shards and compressed copies up to
+    # date for just those files.
+    def __init__(
+        self,
+        dir_path_content,
+        dir_path_static,
+        template_path,
+        dir_path_public,
+        manifest_path,
+        drafts=False,
+        rebuild=None,
+        refresh=None,
+        cache=None,
+        images=None,
+    ):
+        self.dir_path_content = dir_path_content
+        self.dir_path_static = dir_path_static
+        self.template_path = template_path
+        self.dir_path_public = dir_path_public
+        self.manifest_path = manifest_path
+        self.drafts = drafts
+        self.rebuild = rebuild
+        self.refresh = refresh
+        self.cache = cache
+        self.images = images
+        self.files = self.snapshot()
+
+    def snapshot(self):
+        files = {}
+        for dir_path in [self.dir_path_content, self.dir_path_static]:
+            scan_stats(dir_path, files)
+        try:
+            stat = os.stat(self.template_path)
+            files[self.template_path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return files
+
+    def poll(self):
+        files = self.snapshot()
+        changed = [path for path in files if self.files.get(path) != files[path]]
+        removed = [path for path in self.files if path not in files]
+        self.files = files
+        if len(changed) == 0 and len(removed) == 0:
+            return False
+        self.apply(changed, removed)
+        return True
+
+    def apply(self, changed, removed):
+        start = time.perf_counter()
+        template_changed = False
+        image_changed = False
+        for path in changed + removed:
+            if path == self.template_path or os.path.basename(path) == template_filename:
+                template_changed = True
+            elif self.images is not None and is_within(path, self.dir_path_static):
+                image_changed = image_changed or os.path.splitext(path)[1].lower() in image_extensions
+
+        if self.rebuild is not None and (template_changed or image_changed):
+            _, self.images = self.rebuild()
+            print(f" * rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return
+        if template_changed:
+            print(" * template changed, re-rendering pages")
+            generate_pages_incremental(
+                self.dir_path_content,
+                self.template_path,
+                self.dir_path_public,
+                self.manifest_path,
+                cache=self.cache,
+                images=self.images,
+                drafts=self.drafts,
+            )
+        outputs = []
+        pages_changed = False
+        for path in changed + removed:
+            if path == self.template_path or os.path.basename(path) == template_filename:
+                continue
+            if is_within(path, self.dir_path_static):
+                dest_path = os.path.join(self.dir_path_public, os.path.relpath(path, self.dir_path_static))
+                if path in changed:
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    copy_file(path, dest_path)
+                    print(f" * {path} -> {dest_path}")
+                else:
+                    self.remove_output(dest_path)
+            elif path.endswith(".md") and not template_changed:
+                dest_path = self.render(path)
+                pages_changed = True
+            else:
+                continue
+            outputs.append(os.path.relpath(dest_path, self.dir_path_public))
+        if self.refresh is not None and len(outputs) > 0:
+            self.refresh(outputs, pages_changed)
+        print(f" * rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def render(self, from_path):
+        # Also takes down the output of a page that was removed or just
+        # became a draft.
+        dest_path = page_dest_path(from_path, self.dir_path_content, self.dir_path_public)
+        published = update_page(
+            from_path,
+            self.dir_path_content,
+            self.template_path,
+            self.dir_path_public,
+            self.manifest_path,
+            self.cache,
+            self.images,
+            self.drafts,
+        )
+        if published is None:
+            print(f" * removed {dest_path}")
+        else:
+            print(f" * {from_path} -> {dest_path}")
+        return dest_path
+
+    def remove_output(self, dest_path):
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), self.dir_path_public)
+            print(f" * removed {dest_path}")
+
+
+def scan_stats(dir_path, files):
+    try:
+        entries = list(os.scandir(dir_path))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir():
+            scan_stats(entry.path, files)
+        else:
+            stat = entry.stat()
+            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def is_within(path, dir_path):
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(dir_path)]) == os.path.abspath(dir_path)
+
+
+def serve(dir_path_public, port, notifier):
+    handler = partial(LiveReloadHandler, directory=dir_path_public)
+    LiveReloadHandler.notifier = notifier
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(watcher, port, interval=0.2):
+    notifier = ReloadNotifier()
+    server = serve(watcher.dir_path_public, port, notifier)
+    print(f"Watching for changes, serving http://127.0.0.1:{port}/ (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                if watcher.poll():
+                    notifier.notify()
+            except Exception as e:
+                # Keep watching: the next save usually fixes a half-written file.
+                clear_template_cache()
+                print(f" ! {type(e).__name__}: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()